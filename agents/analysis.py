@@ -230,8 +230,6 @@ REMINDER: For any visualizations/plots:
 
     def _extract_python_code(self, response: str) -> str:
         """Extract Python code from markdown code blocks"""
-        import re
-        
         # Remove any leading/trailing whitespace
         response = response.strip()
         
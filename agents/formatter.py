@@ -2,6 +2,7 @@ from langfuse.openai import OpenAI
 from config import LLM_API_KEY
 from file_manager import file_manager
 import json
+import re
 from typing import Any, Dict, List
 import logging
 
@@ -36,8 +37,6 @@ class FormatterAgent:
     
     def _clean_response(self, response: str) -> str:
         """Clean up markdown formatting from LLM response"""
-        import re
-        
         # Remove markdown code blocks (```json, ```, etc.)
         # This handles patterns like ```json\n{...}\n``` or ```\n{...}\n```
         cleaned = re.sub(r'```(?:json|javascript|js)?\s*\n?', '', response)
@@ -72,8 +71,9 @@ class FormatterAgent:
             # Check if original question asks for JSON array format
             json_array_requested = "JSON array" in question.lower() or "json array" in question
             
-            # Filter data for LLM using file manager
-            filtered_data = file_manager.filter_data_for_llm(main_data)
+            # Filter data for LLM using file manager, collecting the file references on the way
+            found_files = set()
+            filtered_data = file_manager.filter_data_for_llm(main_data, found_files)
             
             # Create prompt for formatting
             system_prompt = f"""You are an expert at formatting data analysis results into clear, well-structured responses. Your task is to format the analysis results according to the specific requirements in the question and instructions.
@@ -135,11 +135,11 @@ Please format this data into the exact response format requested in the original
             # Convert file references to base64 for final output using file manager
             if api_mode:
                 # For API responses, use raw base64 to avoid double prefix issues with test frameworks
-                final_response = file_manager.convert_files_in_response_to_raw_base64(main_data, cleaned_response)
+                final_response = file_manager.convert_files_in_response_to_raw_base64(main_data, cleaned_response, known_files=found_files)
                 self.logger.info("Converted files to raw base64 for API response")
             else:
                 # For other outputs, use full data URIs
-                final_response = file_manager.convert_files_in_response(main_data, cleaned_response)
+                final_response = file_manager.convert_files_in_response(main_data, cleaned_response, known_files=found_files)
                 self.logger.info("Converted files to data URIs for standard response")
             
             # Check if response is too long and might cause issues
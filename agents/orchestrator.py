@@ -15,18 +15,18 @@ class OrchestratorAgent:
         self.client = OpenAI(api_key=LLM_API_KEY)
         self.logger = logging.getLogger(__name__)
 
-        self.context = {
-            "current_data": None, # contains the current data model is using for analysis (will also contain the data from the additional files and results from scraping (if scrape tool is used))
-            "analysis_results": None, # contains the analysis results after data_analysis tool is used
-            "final_output": None # contains the final output after format_final_output tool is used (this is the final answer to the question to be returned to the user)
-        }
+        # Stateless helper agents are built once and reused for every question this agent processes
+        self.formatter_agent = FormatterAgent()
+        self.scraper_agent = ScraperAgent()
+
+        self.reset()
         
         # Available tools for the agent
         self.available_tools = {
             "scrape": {
-                "description": "Scrapes data from a website and returns it in a structured format",
-                "parameters": {"url": "string"},
-                "returns": "structured data from the website"
+                "description": "Scrapes data from a website and returns it in a structured format. Multiple URLs separated by spaces are scraped concurrently",
+                "parameters": {"url": "string (one URL, or several URLs separated by spaces)"},
+                "returns": "structured data from the website (a mapping of URL to data when several URLs are given)"
             },
             "data_analysis": {
                 "description": "Analyzes data, performs statistical analysis, and creates visualizations. Supports DuckDB for SQL queries on remote datasets (S3, parquet files). Returns analysis results and graphs as base64 images",
@@ -40,6 +40,14 @@ class OrchestratorAgent:
             }
         }
 
+    def reset(self):
+        """Clear per-request context so the agent can be reused for a new request"""
+        self.context = {
+            "current_data": None, # contains the current data model is using for analysis (will also contain the data from the additional files and results from scraping (if scrape tool is used))
+            "analysis_results": None, # contains the analysis results after data_analysis tool is used
+            "final_output": None # contains the final output after format_final_output tool is used (this is the final answer to the question to be returned to the user)
+        }
+
     def _get_prompt(self, question: str, additional_files: dict = None):
         """Returns a structured prompt for the OpenAI completions API"""
         if additional_files is None:
@@ -266,9 +274,10 @@ Answer:
         if additional_files is None:
             additional_files = {}
 
+        # The analysis agent is per question: code it runs can leave tables behind in its DuckDB connection
         analysis_agent = AnalysisAgent()
-        formatter_agent = FormatterAgent()
-        scraper_agent = ScraperAgent()
+        formatter_agent = self.formatter_agent
+        scraper_agent = self.scraper_agent
 
         # Main agent loop
         while True:
@@ -302,10 +311,19 @@ Answer:
                 parameters = build_parameter(response_json["tool_parameter"])
 
                 if tool_name == "scrape":
-                    if len(parameters) > 1:
-                        raise Exception("Scrape tool can only take one parameter")
-                    if not urlparse(parameters[0]).scheme:
+                    if not all(isinstance(parameter, str) and urlparse(parameter).scheme for parameter in parameters):
                         raise Exception("Parameter is not a valid URL")
+                    if len(parameters) > 1:
+                        # Several URLs: fetch and scrape them concurrently
+                        outputs = scraper_agent.scrape_many(question, instructions, parameters)
+                        failed = {url: result for url, result in outputs.items() if not result or result.get("status") != "success"}
+                        if failed:
+                            self.logger.error(f"Scraper error details: {failed}")
+                            url, result = next(iter(failed.items()))
+                            error_msg = result.get("error", f"Scraper failed with status: {result.get('status', 'unknown')}") if result else "Scraper returned no output"
+                            raise Exception(f"Scraper failed for {url}: {error_msg}")
+                        self.context["current_data"] = {url: result["data"] for url, result in outputs.items()}
+                        continue
                     output = scraper_agent.scrape(question, instructions, parameters[0])
                     if output and output.get("status") == "success":
                         self.context["current_data"] = output["data"]
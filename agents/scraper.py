@@ -1,25 +1,143 @@
 from bs4 import BeautifulSoup
+import soupsieve as sv
+import copy
+from collections import Counter
+import hashlib
 import json
 import re
+import threading
+from types import CodeType
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from cachetools import LRUCache, TTLCache
 from typing import Dict, List, Any, Optional
 from urllib.parse import urlparse
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import os
 from langfuse.openai import OpenAI
 from config import LLM_API_KEY
 import logging
 
+# Prefer the C-based lxml parser; fall back to the stdlib parser if it is not installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Optional Aho-Corasick matcher for scoring fallback tables in one pass over their text
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Below this many distinct keywords, per-keyword substring checks beat building an automaton
+MIN_AUTOMATON_KEYWORDS = 5
+
+# Structured output schema for generated scraper code
+SCRAPER_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "scraper",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "code": {"type": "string"}
+            },
+            "required": ["code"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Page type keyword patterns (substring semantics, matched against lowered page text)
+LIST_PAGE_PATTERN = re.compile(r'list|ranking|top|best|chart')
+PRODUCT_PAGE_PATTERN = re.compile(r'product|item|buy|price')
+ARTICLE_PAGE_PATTERN = re.compile(r'article|news|story')
+
+# Bracketed references such as [1] or [note 2] in table cells
+REFERENCE_PATTERN = re.compile(r'\[.*?\]')
+
+# Precompiled CSS selectors for fallback extraction
+LIST_SELECTOR = sv.compile('ul, ol')
+CONTENT_SELECTOR = sv.compile('p, div, span')
+
+# Fallback extraction limits
+MAX_FALLBACK_ROWS = 50
+MAX_FALLBACK_ITEMS = 50  # <li> elements scanned per list
+MAX_ITEMS_PER_LIST = 20  # Items collected per list before the scan stops
+
+# Successful scrape results keyed by (url, instructions). Module level so the ScraperAgents of all
+# thread-local orchestrators share one cache.
+SCRAPE_CACHE = TTLCache(maxsize=256, ttl=300)
+SCRAPE_CACHE_LOCK = threading.Lock()
+
+# Generated scraper (source, compiled code) keyed by page structure fingerprint, so pages sharing a layout
+# and instructions skip the LLM round-trip
+SCRAPER_CODE_CACHE = LRUCache(maxsize=512)
+SCRAPER_CODE_CACHE_LOCK = threading.Lock()
+
+@lru_cache(maxsize=128)
+def _compile_keyword_pattern(keywords: tuple) -> Optional[re.Pattern]:
+    """Compile instruction keywords into one case-insensitive alternation (longest first)"""
+    if not keywords:
+        return None
+    ordered_keywords = sorted(keywords, key=len, reverse=True)
+    return re.compile('|'.join(map(re.escape, ordered_keywords)), re.IGNORECASE)
+
+@lru_cache(maxsize=128)
+def _build_keyword_automaton(keywords: tuple):
+    """Build an Aho-Corasick automaton over lowercase keywords, or None if it isn't worth it"""
+    if ahocorasick is None or len(keywords) < MIN_AUTOMATON_KEYWORDS:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+# Upper bound on URLs scraped concurrently by scrape_many
+MAX_CONCURRENT_SCRAPES = 5
+
+# (connect, read) timeouts for page fetches
+FETCH_TIMEOUT = (3.05, 27)
+
+def _create_http_session() -> requests.Session:
+    """Create a pooled HTTP session with retries for page fetches"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=3, backoff_factor=0.3)
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+    })
+    return session
+
+# Shared across agents so keep-alive connections survive between questions
+HTTP_SESSION = _create_http_session()
+
 class ScraperAgent:
     def __init__(self):
         self.model = "gpt-4.1"
         self.client = OpenAI(api_key=LLM_API_KEY)
         self.logger = logging.getLogger(__name__)
+        self.session = HTTP_SESSION
     
-    def _get_response(self, prompt: dict):
+    def _get_response(self, prompt: dict, response_format: Optional[dict] = None):
         """Get a response from the OpenAI API"""
         try:
+            request_kwargs = {}
+            if response_format:
+                request_kwargs["response_format"] = response_format
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
@@ -30,6 +148,7 @@ class ScraperAgent:
                 metadata={
                     "langfuse_tags": ["scraper-agent"]
                 },
+                **request_kwargs
             )
             return response.choices[0].message.content
         except Exception as e:
@@ -38,6 +157,26 @@ class ScraperAgent:
 
 
 
+    def _cache_key(self, url: str, instructions: str) -> str:
+        """Build the scrape cache key for a URL and its extraction instructions"""
+        return hashlib.blake2b(f"{url}|{instructions}".encode('utf-8')).hexdigest()
+
+    def _structure_fingerprint(self, structure_analysis: Dict[str, Any], instructions: str) -> str:
+        """Fingerprint the page layout and instructions for the generated scraper cache"""
+        table_selectors = [
+            f"{'.'.join(table.get('classes') or [])}#{table.get('id', '')}|{table.get('caption') or ''}|{table.get('column_count', 0)}"
+            for table in structure_analysis.get('table_details', [])
+        ]
+        fingerprint = "|".join([
+            structure_analysis['domain'],
+            structure_analysis['page_type'],
+            str(structure_analysis['table_count']),
+            str(structure_analysis['list_count']),
+            ";".join(table_selectors),
+            instructions
+        ])
+        return hashlib.blake2b(fingerprint.encode('utf-8')).hexdigest()
+
     def _extract_url_from_parameter(self, parameter: str) -> str:
         """Extract URL from parameter string that may contain @ symbol"""
         url = parameter.strip()
@@ -53,11 +192,8 @@ class ScraperAgent:
     def _fetch_with_requests(self, url: str) -> Optional[str]:
         """Fetch page content using requests library"""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
             self.logger.info(f"Fetching page content for: {url}")
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.session.get(url, timeout=FETCH_TIMEOUT)
             response.raise_for_status()
             self.logger.info(f"Successfully fetched content ({len(response.text)} characters)")
             return response.text
@@ -65,10 +201,12 @@ class ScraperAgent:
             self.logger.error(f"Failed to fetch content: {e}")
             return None
 
-    def _analyze_page_structure(self, html_content: str, url: str) -> Dict[str, Any]:
+    def _parse_html(self, html_content: str) -> BeautifulSoup:
+        """Parse the full page HTML once so structure analysis and generated scrapers share the same tree"""
+        return BeautifulSoup(html_content, HTML_PARSER)
+
+    def _analyze_page_structure(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
         """Analyze the page structure and identify key elements"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
         # Basic page analysis
         title = soup.find('title')
         title_text = title.get_text() if title else "No title found"
@@ -85,10 +223,10 @@ class ScraperAgent:
             caption = table.find('caption')
             caption_text = caption.get_text(strip=True) if caption else None
             
-            # Get first few rows to understand structure
-            rows = table.find_all('tr')[:3]
+            # Collect rows once; reused for sampling and the row/column counts
+            all_rows = table.find_all('tr')
             sample_data = []
-            for row in rows:
+            for row in all_rows[:3]:
                 cells = [cell.get_text(strip=True)[:50] for cell in row.find_all(['td', 'th'])]  # Limit cell text
                 if cells:
                     sample_data.append(cells)
@@ -98,8 +236,8 @@ class ScraperAgent:
                 'classes': table.get('class', []),
                 'id': table.get('id', ''),
                 'caption': caption_text,
-                'row_count': len(table.find_all('tr')),
-                'column_count': len(table.find_all('tr')[0].find_all(['td', 'th'])) if table.find_all('tr') else 0,
+                'row_count': len(all_rows),
+                'column_count': len(all_rows[0].find_all(['td', 'th'])) if all_rows else 0,
                 'sample_data': sample_data
             }
             table_details.append(table_info)
@@ -108,12 +246,12 @@ class ScraperAgent:
         lists = soup.find_all(['ul', 'ol'])
         list_details = []
         for i, list_elem in enumerate(lists[:5]):  # Limit to first 5 lists
-            items = list_elem.find_all('li')[:3]  # Sample first 3 items
-            sample_items = [item.get_text(strip=True)[:100] for item in items]
+            items = list_elem.find_all('li')
+            sample_items = [item.get_text(strip=True)[:100] for item in items[:3]]  # Sample first 3 items
             list_details.append({
                 'index': i,
                 'type': list_elem.name,
-                'item_count': len(list_elem.find_all('li')),
+                'item_count': len(items),
                 'sample_items': sample_items
             })
         
@@ -122,6 +260,9 @@ class ScraperAgent:
         domain = parsed_url.netloc
         path = parsed_url.path
         
+        # Extract the page text once; it feeds both the preview and page type detection
+        full_text = soup.get_text()
+        
         structure_analysis = {
             'title': title_text,
             'domain': domain,
@@ -133,25 +274,27 @@ class ScraperAgent:
             'list_count': len(lists),
             'list_details': list_details,
             'main_content_found': main_content is not None,
-            'page_type': self._identify_page_type(soup, domain, path),
-            'content_preview': soup.get_text()[:500] + "..." if len(soup.get_text()) > 500 else soup.get_text()
+            'page_type': self._identify_page_type(soup, domain, path, full_text_lower=full_text.lower()),
+            'content_preview': full_text[:500] + "..." if len(full_text) > 500 else full_text
         }
         
         return structure_analysis
 
-    def _identify_page_type(self, soup: BeautifulSoup, domain: str, path: str) -> str:
+    def _identify_page_type(self, soup: BeautifulSoup, domain: str, path: str, full_text_lower: Optional[str] = None) -> str:
         """Identify the type of page based on content and URL"""
-        text = soup.get_text().lower()
-        
+        # Domain check first so the fast path never touches the page text
         if 'wikipedia' in domain:
             return 'wikipedia'
-        elif any(word in text for word in ['list', 'ranking', 'top', 'best', 'chart']):
+        
+        text = full_text_lower if full_text_lower is not None else soup.get_text().lower()
+        
+        if LIST_PAGE_PATTERN.search(text):
             return 'list_page'
-        elif any(word in text for word in ['product', 'item', 'buy', 'price']):
+        elif PRODUCT_PAGE_PATTERN.search(text):
             return 'product_page'
-        elif any(word in text for word in ['article', 'news', 'story']):
+        elif ARTICLE_PAGE_PATTERN.search(text):
             return 'article'
-        elif soup.find_all('table'):
+        elif soup.find('table') is not None:
             return 'data_table'
         else:
             return 'general'
@@ -169,7 +312,7 @@ CRITICAL REQUIREMENTS:
 5. Handle malformed HTML gracefully - extract what you can
 6. DO NOT be overly strict with validation - extract data if it's recognizable
 
-RETURN FORMAT: Python function code only, no markdown, no explanations.
+RETURN FORMAT: A JSON object with a single "code" field containing the Python function source, no markdown, no explanations.
 
 The function must be named `custom_scraper` and:
 - Take BeautifulSoup object as input
@@ -230,50 +373,51 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
         response = self._get_response({
             "system_prompt": system_prompt,
             "user_prompt": user_prompt
-        })
+        }, response_format=SCRAPER_RESPONSE_FORMAT)
         
-        # Clean up the response to remove markdown formatting
-        if response:
-            # Remove markdown code blocks
-            response = re.sub(r'```python\s*', '', response)
-            response = re.sub(r'```\s*$', '', response)
-            response = re.sub(r'^```\s*', '', response)
-            response = response.strip()
+        if not response:
+            return None
         
-        return response
+        # Structured output guarantees a JSON object with the code field
+        try:
+            return json.loads(response)["code"].strip()
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            self.logger.error(f"Failed to parse scraper code from structured response: {e}")
+            return None
 
-    def _validate_scraper_code(self, scraper_code: str) -> bool:
-        """Validate the generated scraper code for basic syntax and structure"""
+    def _compile_scraper_code(self, scraper_code: str) -> Optional[CodeType]:
+        """Validate the generated scraper code for basic structure and compile it, or return None"""
         if not scraper_code:
-            return False
+            return None
         
         # Check for required function
         if 'def custom_scraper(' not in scraper_code:
-            return False
+            return None
         
         # Check for basic BeautifulSoup usage
         if 'soup' not in scraper_code:
-            return False
+            return None
         
         # Check for return statement
         if 'return' not in scraper_code:
-            return False
+            return None
         
-        # Try to compile the code
+        # Compile once; the code object is executed directly and cached with the source
         try:
-            compile(scraper_code, '<string>', 'exec')
-            return True
-        except SyntaxError:
-            return False
+            return compile(scraper_code, '<generated_scraper>', 'exec')
+        except (SyntaxError, ValueError):
+            return None
 
-    def _execute_custom_scraper(self, scraper_code: str, html_content: str) -> Dict[str, Any]:
+    def _execute_custom_scraper(self, scraper_code: str, soup: BeautifulSoup, compiled_scraper: Optional[CodeType] = None) -> Dict[str, Any]:
         """Execute the generated custom scraper with enhanced error handling"""
         try:
             self.logger.info(f"Executing scraper code (length: {len(scraper_code)} characters)")
             
-            # Validate code first
-            if not self._validate_scraper_code(scraper_code):
-                return {"error": "Generated scraper code failed validation", "scraper_code": scraper_code[:500]}
+            # Validate and compile unless a precompiled code object was supplied
+            if compiled_scraper is None:
+                compiled_scraper = self._compile_scraper_code(scraper_code)
+                if compiled_scraper is None:
+                    return {"error": "Generated scraper code failed validation", "scraper_code": scraper_code[:500]}
             
             # Create a safe namespace for the scraper
             safe_namespace = {
@@ -309,16 +453,15 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
                 }
             }
             
-            # Execute the scraper code
-            exec(scraper_code, safe_namespace)
+            # Execute the compiled scraper code
+            exec(compiled_scraper, safe_namespace)
             
             # Get the custom_scraper function
             custom_scraper = safe_namespace.get('custom_scraper')
             if not custom_scraper:
                 return {"error": "custom_scraper function not found in generated code"}
             
-            # Parse HTML and execute scraper
-            soup = BeautifulSoup(html_content, 'html.parser')
+            # Execute scraper on the already parsed page
             result = custom_scraper(soup)
             
             # Validate result structure
@@ -343,7 +486,7 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
             self.logger.error(f"Error executing custom scraper: {e}")
             return {"error": f"Execution error: {str(e)}", "scraper_code_preview": scraper_code[:500]}
 
-    def _fallback_extraction(self, soup: BeautifulSoup, instructions: str) -> Dict[str, Any]:
+    def _fallback_extraction(self, soup: BeautifulSoup, instructions: str, max_list_items: int = MAX_ITEMS_PER_LIST) -> Dict[str, Any]:
         """Generic fallback extraction method for any webpage"""
         self.logger.info("Using fallback extraction method...")
         
@@ -358,7 +501,24 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
         }
         
         instruction_keywords = [word.lower() for word in re.findall(r'\b\w+\b', instructions) if len(word) > 3]
-        
+
+        # Single alternation for "any keyword present" checks on main content
+        keyword_pattern = _compile_keyword_pattern(tuple(sorted(set(instruction_keywords))))
+
+        # Every keyword contained in the text counts, including nested ones ("rank" in "ranking"),
+        # and repeated instruction words keep their weight
+        keyword_weights = Counter(instruction_keywords)
+        keyword_automaton = _build_keyword_automaton(tuple(sorted(keyword_weights)))
+
+        def count_keyword_matches(text: str) -> int:
+            """Count instruction keywords (with repeats) contained in text"""
+            text = text.lower()
+            if keyword_automaton is not None:
+                # One pass over the text regardless of keyword count; Aho-Corasick reports overlapping matches
+                found = {keyword for _, keyword in keyword_automaton.iter(text)}
+                return sum(keyword_weights[keyword] for keyword in found)
+            return sum(weight for keyword, weight in keyword_weights.items() if keyword in text)
+
         # Strategy 1: Try tables first
         tables = soup.find_all('table')
         result["debug"]["tables_found"] = len(tables)
@@ -372,25 +532,23 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
                 # Check caption relevance
                 caption = table.find('caption')
                 if caption:
-                    caption_text = caption.get_text(strip=True).lower()
-                    score += sum(2 for keyword in instruction_keywords if keyword in caption_text)
-                
+                    score += 2 * count_keyword_matches(caption.get_text(strip=True))
+
                 # Check content relevance
-                table_text = table.get_text().lower()
-                score += sum(1 for keyword in instruction_keywords if keyword in table_text)
+                score += count_keyword_matches(table.get_text())
                 
                 # Prefer tables with more rows (likely data tables)
-                rows = table.find_all('tr')
+                # Only header + 50 data rows are ever used and the score caps at 50 rows, so stop scanning there
+                rows = table.find_all('tr', limit=MAX_FALLBACK_ROWS + 1)
                 score += min(len(rows) / 10, 5)  # Max 5 points for row count
                 
-                table_scores.append((score, i, table))
+                table_scores.append((score, i, table, rows))
             
             # Sort by score and try best tables first
             table_scores.sort(reverse=True, key=lambda x: x[0])
             
-            for score, table_idx, table in table_scores[:3]:  # Try top 3 tables
+            for score, table_idx, table, rows in table_scores[:3]:  # Try top 3 tables
                 try:
-                    rows = table.find_all('tr')
                     if len(rows) < 2:  # Need header + data
                         continue
                     
@@ -406,21 +564,18 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
                     
                     # Extract data rows
                     extracted_count = 0
-                    for row in rows[1:51]:  # Limit to 50 rows max
+                    for row in rows[1:MAX_FALLBACK_ROWS + 1]:  # Limit to 50 rows max
                         cells = row.find_all(['td', 'th'])
                         if len(cells) >= len(headers):
-                            row_data = {}
-                            for j, cell in enumerate(cells[:len(headers)]):
-                                if j < len(headers):
-                                    # Clean the cell text
-                                    cell_text = cell.get_text(strip=True)
-                                    # Remove reference numbers and brackets
-                                    cell_text = re.sub(r'\[.*?\]', '', cell_text).strip()
-                                    row_data[headers[j]] = cell_text
+                            # Clean the cell text, removing reference numbers and brackets
+                            cell_texts = [
+                                REFERENCE_PATTERN.sub('', cell.get_text(strip=True)).strip()
+                                for cell in cells[:len(headers)]
+                            ]
                             
-                            # Only add if row has meaningful data
-                            if any(value and len(value) > 1 for value in row_data.values()):
-                                result["data"].append(row_data)
+                            # Only build the row if it has meaningful data
+                            if any(len(cell_text) > 1 for cell_text in cell_texts):
+                                result["data"].append(dict(zip(headers, cell_texts)))
                                 extracted_count += 1
                     
                     result["debug"]["extraction_attempts"].append(
@@ -435,31 +590,35 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
         
         # Strategy 2: Try lists if no table data found
         if not result["data"]:
-            lists = soup.find_all(['ul', 'ol'])
+            lists = LIST_SELECTOR.select(soup)
             result["debug"]["lists_found"] = len(lists)
             
             for i, list_elem in enumerate(lists[:3]):  # Try first 3 lists
                 try:
-                    items = list_elem.find_all('li')
+                    items = list_elem.find_all('li', limit=MAX_FALLBACK_ITEMS)
                     if len(items) < 3:  # Need meaningful amount of data
                         continue
                     
-                    list_data = []
-                    for item in items[:50]:  # Limit to 50 items
+                    # Collect texts and links column-wise; records are only built for the winning list
+                    texts = []
+                    links = []
+                    for item in items:  # Limited to 50 items by the scan
                         item_text = item.get_text(strip=True)
-                        if item_text and len(item_text) > 2:
-                            # Try to extract structured data from list items
-                            item_data = {"text": item_text}
+                        if len(item_text) > 2:
+                            texts.append(item_text)
                             
                             # Look for links
                             link = item.find('a')
-                            if link and link.get('href'):
-                                item_data["link"] = link.get('href')
-                                if not item_data["text"]:
-                                    item_data["text"] = link.get_text(strip=True)
-                            
-                            list_data.append(item_data)
+                            links.append(link.get('href') if link is not None else None)
+                            if len(texts) >= max_list_items:
+                                break
                     
+                    list_data = [
+                        {"text": text, "link": href} if href else {"text": text}
+                        for text, href in zip(texts, links)
+                    ]
+                    
+                    # The first list that yields anything wins; later lists are not scanned
                     if list_data:
                         result["data"] = list_data
                         result["debug"]["extraction_attempts"].append(f"List {i}: Extracted {len(list_data)} items")
@@ -472,13 +631,12 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
         if not result["data"]:
             main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
             if main_content:
-                # Look for any structured content
-                structured_elements = main_content.find_all(['p', 'div', 'span'], limit=20)
+                # Look for any structured content, streaming matches instead of building a list
                 content_data = []
                 
-                for elem in structured_elements:
+                for elem in CONTENT_SELECTOR.iselect(main_content, limit=20):
                     text = elem.get_text(strip=True)
-                    if text and len(text) > 10 and any(keyword in text.lower() for keyword in instruction_keywords):
+                    if len(text) > 10 and keyword_pattern is not None and keyword_pattern.search(text):
                         content_data.append({"content": text})
                 
                 if content_data:
@@ -487,45 +645,77 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
         
         return result
 
-    def scrape(self, question: str, instructions: str, parameter: str) -> Dict[str, Any]:
+    def scrape(self, question: str, instructions: str, parameter: str, force_refresh: bool = False) -> Dict[str, Any]:
         """
-        Main scraping method with improved custom scraper generation and fallbacks
+        Main scraping method with improved custom scraper generation and fallbacks.
+        Successful results are cached per (url, instructions); pass force_refresh to bypass the cache.
         """
         try:
             # Step 1: Extract URL from parameter
             url = self._extract_url_from_parameter(parameter)
             self.logger.info(f"Processing URL: {url}")
             
+            cache_key = self._cache_key(url, instructions)
+            if not force_refresh:
+                with SCRAPE_CACHE_LOCK:
+                    cached_result = SCRAPE_CACHE.get(cache_key)
+                if cached_result is not None:
+                    self.logger.info(f"Returning cached scrape result for: {url}")
+                    result = copy.deepcopy(cached_result)
+                    result["debug"]["cache_hit"] = True
+                    return result
+            
             # Step 2: Fetch page content
             html_content = self._fetch_page_content(url)
             if not html_content:
                 return {"error": "Failed to fetch page content"}
             
+            # Parse once; the same soup is reused by every step below
+            soup = self._parse_html(html_content)
+            
             # Step 3: Analyze page structure
             self.logger.info("Analyzing page structure...")
-            structure_analysis = self._analyze_page_structure(html_content, url)
+            structure_analysis = self._analyze_page_structure(soup, url)
             self.logger.info(f"Page type identified: {structure_analysis['page_type']}")
             self.logger.info(f"Tables found: {structure_analysis['table_count']}")
             
-            # Step 4: Generate custom scraper
-            scraper_code = self._generate_custom_scraper(structure_analysis, instructions, html_content)
+            # Step 4: Generate custom scraper, reusing one generated for the same page structure
+            fingerprint = self._structure_fingerprint(structure_analysis, instructions)
+            cached_scraper = None
+            if not force_refresh:
+                with SCRAPER_CODE_CACHE_LOCK:
+                    cached_scraper = SCRAPER_CODE_CACHE.get(fingerprint)
+            scraper_cache_hit = cached_scraper is not None
+            if scraper_cache_hit:
+                self.logger.info("Reusing cached custom scraper for matching page structure")
+                scraper_code, compiled_scraper = cached_scraper
+            else:
+                scraper_code = self._generate_custom_scraper(structure_analysis, instructions, html_content)
+                compiled_scraper = self._compile_scraper_code(scraper_code)
             
             if not scraper_code:
                 self.logger.warning("Failed to generate custom scraper, using fallback...")
-                soup = BeautifulSoup(html_content, 'html.parser')
                 return self._fallback_extraction(soup, instructions)
             
             # Step 5: Execute custom scraper
-            scraped_data = self._execute_custom_scraper(scraper_code, html_content)
+            scraped_data = self._execute_custom_scraper(scraper_code, soup, compiled_scraper)
             
             # Step 6: Check if scraper worked, use fallback if needed
             if "error" in scraped_data:
                 self.logger.warning(f"Custom scraper failed: {scraped_data['error']}")
-                soup = BeautifulSoup(html_content, 'html.parser')
+                if scraper_cache_hit:
+                    # The layout changed under the cached scraper; drop it so the next request regenerates
+                    with SCRAPER_CODE_CACHE_LOCK:
+                        SCRAPER_CODE_CACHE.pop(fingerprint, None)
                 fallback_result = self._fallback_extraction(soup, instructions)
                 fallback_result["debug"]["custom_scraper_error"] = scraped_data["error"]
                 return fallback_result
             
+            # Only scrapers that ran successfully are worth reusing
+            if not scraper_cache_hit:
+                with SCRAPER_CODE_CACHE_LOCK:
+                    SCRAPER_CODE_CACHE[fingerprint] = (scraper_code, compiled_scraper)
+            
             # Step 7: Prepare final result
             result = {
                 "data": scraped_data.get("data", []),
@@ -536,10 +726,16 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
                     "tables_found": structure_analysis['table_count'],
                     "scraper_method": "custom_generated",
                     "data_count": len(scraped_data.get("data", [])),
-                    "scraper_debug": scraped_data.get("debug", {})
+                    "scraper_debug": scraped_data.get("debug", {}),
+                    "scraper_cache_hit": scraper_cache_hit,
+                    "cache_hit": False
                 }
             }
             
+            # Cache a private copy so callers can mutate the returned data freely
+            with SCRAPE_CACHE_LOCK:
+                SCRAPE_CACHE[cache_key] = copy.deepcopy(result)
+            
             return result
             
         except Exception as e:
@@ -550,4 +746,14 @@ Be LIBERAL in extraction - if it looks like data, extract it. Don't be picky abo
                 "instructions": instructions,
                 "parameter": parameter,
                 "status": "error"
-            }
\ No newline at end of file
+            }
+
+    def scrape_many(self, question: str, instructions: str, parameters: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Scrape several URLs concurrently so wall time is bounded by the slowest page.
+        Returns scrape() results keyed by parameter, in input order.
+        """
+        max_workers = max(1, min(len(parameters), MAX_CONCURRENT_SCRAPES))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda parameter: self.scrape(question, instructions, parameter), parameters)
+            return dict(zip(parameters, results))
@@ -1,147 +1,305 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Request, g, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import orjson
 from dotenv import load_dotenv
+import atexit
+import codecs
+import io
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import random
+import threading
 import time
-import json
+import re
+# SIMD-accelerated base64 when available, stdlib otherwise (same b64decode API)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+from collections import deque
 from pathlib import Path
 from agents.orchestrator import OrchestratorAgent
 # Import our custom modules
-from config import LOGS_DIR
+from config import LOGS_DIR, ensure_dirs
 import os
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Accepted extensions for the questions file
+ALLOWED_QUESTIONS_EXTENSIONS = frozenset({'.txt', '.text'})
+
+# Bytes inspected to reject binary uploads before decoding the whole file
+QUESTIONS_SNIFF_BYTES = 512
+
+# Questions are short prompts; anything beyond this many bytes is rejected instead of decoded
+MAX_QUESTIONS_BYTES = 2_000_000
+
+# Longest prefix of user-supplied text written to the logs
+MAX_LOG_STR = 200
+
+# Uploads up to this size are parsed into memory instead of being spooled to a temp file
+# (Werkzeug's default spools anything over 500 KB); matches MAX_CONTENT_LENGTH below
+MAX_IN_MEMORY_UPLOAD = 16 * 1024 * 1024
+
+# Retry backoff configuration (seconds)
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30
+RETRY_JITTER = 0.5
+
+# One or more data URI prefixes stacked in front of the real one, e.g.
+# "data:image/png;base64,data:image/png;base64,iVBOR..." (the last prefix is kept)
+DUPLICATE_DATA_URI_PREFIX = re.compile(r'(?:data:[^;,]*;base64,)+(?=data:[^;,]*;base64,)')
+
+# Leading whitespace then "{": a JSON object string, detected without stripping a copy of it
+JSON_OBJECT_START = re.compile(r'\s*\{')
+
+# Leading base64 characters decoded to sanity-check a payload (a multiple of 4, so
+# a prefix of a valid payload never needs padding)
+BASE64_PROBE_CHARS = 4096
+
+# Strings shorter than this are never probed: short data URIs are tiny glyphs or error text,
+# and only image payloads are long enough to be worth checking
+MIN_BASE64_PROBE_LEN = 256
+
+# Characters allowed in a base64 payload (stripped by bytes.translate to find anything else)
+BASE64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/='
+
+# Keys whose values are expected to hold raw (prefix-less) base64 images
+RAW_BASE64_KEYS = frozenset({'bar_chart', 'line_chart', 'scatter_plot', 'histogram', 'pie_chart', 'graph', 'chart', 'image'})
+
 # Setup logging
 def setup_logging():
-    """Setup logging configuration"""
-    # Ensure logs directory exists
-    LOGS_DIR.mkdir(exist_ok=True)
+    """
+    Setup logging configuration.
+    Records are queued by the request threads and written to file/console by a background listener.
+    """
+    # Ensure storage and logs directories exist
+    ensure_dirs()
+    
+    # The real handlers are owned by the listener thread
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    file_handler = logging.FileHandler(LOGS_DIR / 'app.log')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    listener.start()
+    # Flush queued records on shutdown
+    atexit.register(listener.stop)
     
     # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(LOGS_DIR / 'app.log'),
-            logging.StreamHandler()
-        ]
-    )
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
 
-def validate_and_fix_base64_urls(data):
+def wait_before_retry(retry_count, start_time, max_retry_time):
     """
-    Validate and fix malformed base64 URLs that might have duplicate prefixes.
-    This prevents issues with test frameworks that incorrectly process base64 data.
+    Sleep with exponential backoff and jitter before retry number `retry_count` (1-based).
+    The sleep is skipped if it would push the request past its time budget.
     """
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, str):
-                # Check for various malformed base64 patterns
-                if value.startswith("data:image/png;base64,data:image/png;base64,"):
-                    # Fix duplicate PNG prefix
-                    fixed_value = value.replace("data:image/png;base64,data:image/png;base64,", "data:image/png;base64,")
-                    data[key] = fixed_value
-                    logger.warning(f"Fixed duplicate PNG base64 prefix in key '{key}'")
-                elif value.startswith("data:image/jpeg;base64,data:image/jpeg;base64,"):
-                    # Fix duplicate JPEG prefix
-                    fixed_value = value.replace("data:image/jpeg;base64,data:image/jpeg;base64,", "data:image/jpeg;base64,")
-                    data[key] = fixed_value
-                    logger.warning(f"Fixed duplicate JPEG base64 prefix in key '{key}'")
-                elif value.startswith("data:image/") and "data:image/" in value[11:]:
-                    # Generic fix for any duplicate image prefix
-                    first_colon = value.find(":", 11)  # Find second colon after "data:image/"
-                    if first_colon != -1:
-                        fixed_value = value[:first_colon] + value[first_colon:].replace("data:image/", "", 1)
-                        data[key] = fixed_value
-                        logger.warning(f"Fixed duplicate image base64 prefix in key '{key}'")
-                elif value.startswith("data:") and value.count("data:") > 1:
-                    # Generic fix for any duplicate data URI prefix
-                    first_semicolon = value.find(";")
-                    if first_semicolon != -1:
-                        prefix = value[:first_semicolon + 1]
-                        if prefix in value[first_semicolon + 1:]:
-                            fixed_value = value.replace(prefix, "", 1)
-                            data[key] = fixed_value
-                            logger.warning(f"Fixed duplicate data URI prefix in key '{key}'")
-            elif isinstance(value, (dict, list)):
-                # Recursively check nested structures
-                validate_and_fix_base64_urls(value)
-    elif isinstance(data, list):
-        for item in data:
-            if isinstance(item, (dict, list)):
-                validate_and_fix_base64_urls(item)
-    return data
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (retry_count - 1)) + random.uniform(0, RETRY_JITTER)
+    if time.monotonic() - start_time + delay < max_retry_time:
+        logger.info("Backing off %.2f seconds before retry %d", delay, retry_count)
+        time.sleep(delay)
+
+# One orchestrator per worker thread: construction (LLM client setup) happens once,
+# while the per-request context stays isolated between concurrent requests
+_orchestrator_local = threading.local()
+
+def get_orchestrator():
+    """Return this thread's orchestrator agent, reset for a new request"""
+    orchestrator = getattr(_orchestrator_local, 'agent', None)
+    if orchestrator is None:
+        orchestrator = OrchestratorAgent()
+        _orchestrator_local.agent = orchestrator
+    else:
+        orchestrator.reset()
+    return orchestrator
 
-def validate_base64_integrity(data):
+def looks_like_text_upload(file_storage):
     """
-    Validate that base64 data is properly formatted.
-    This handles both raw base64 strings and data URI formatted strings.
+    Cheaply check that an upload is UTF-8 text by inspecting its declared type and first bytes.
+    The stream is rewound afterwards.
+    """
+    mimetype = file_storage.mimetype
+    if mimetype and not (mimetype.startswith('text/') or mimetype == 'application/octet-stream'):
+        return False
+    
+    stream = file_storage.stream
+    head = stream.read(QUESTIONS_SNIFF_BYTES)
+    stream.seek(0)
+    if b'\x00' in head:
+        return False
+    try:
+        # Incremental decode so a multi-byte character cut at the boundary is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def scan_for_data_uri(result):
     """
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, str):
-                # Check if it's a data URI format
-                if value.startswith("data:"):
-                    try:
+    Cheap C-level substring scan so base64 validation can be skipped when there is nothing to check.
+    Returns (found, body): body is the JSON serialization of a non-string result, which the response
+    reuses when validation is skipped, or None.
+    """
+    if isinstance(result, str):
+        return "data:" in result, None
+    try:
+        body = orjson.dumps(result, option=ORJSONProvider.ORJSON_OPTIONS)
+    except (orjson.JSONEncodeError, TypeError):
+        # Can't scan it cheaply; validate to be safe
+        return True, None
+    return b"data:" in body, body
+
+def probe_base64(encoded):
+    """
+    Check the first BASE64_PROBE_CHARS characters of a base64 string, raising if they are malformed.
+    A C-level alphabet scan decides validity; decoding only happens to produce the error.
+    """
+    test_data = encoded[:BASE64_PROBE_CHARS]
+    try:
+        if not test_data.encode('ascii').translate(None, BASE64_ALPHABET):
+            return
+    except UnicodeEncodeError:
+        pass
+    # Short payloads are probed whole; tolerate missing padding on those
+    base64.b64decode(test_data + "=" * (-len(test_data) % 4), validate=True)
+
+def validate_base64(data):
+    """
+    Fix duplicate data URI prefixes and validate base64 payloads in a single pass.
+    Duplicate prefixes come from test frameworks that incorrectly process base64 data;
+    both data URI formatted strings and raw base64 under common image keys are checked.
+    """
+    # Bind hot lookups once; results are parsed JSON, so exact type checks are enough
+    log_info, log_warning, log_error = logger.info, logger.warning, logger.error
+    _type, _dict, _list, _str = type, dict, list, str
+    match_duplicate_prefix = DUPLICATE_DATA_URI_PREFIX.match
+    pending = deque([data])
+    pop, push = pending.pop, pending.append
+    while pending:
+        container = pop()
+        container_type = _type(container)
+        if container_type is _dict:
+            # Replacements are collected and applied after the loop instead of assigning while iterating
+            fixes = []
+            for key, value in container.items():
+                value_type = _type(value)
+                if value_type is _str:
+                    if value.startswith("data:"):
+                        # Fix duplicate prefixes first so the payload below is the real one; the regex
+                        # only runs when another "data:" directly follows the first comma
+                        comma = value.find(",")
+                        if comma != -1 and value.startswith("data:", comma + 1):
+                            match = match_duplicate_prefix(value)
+                            if match:
+                                value = value[match.end():]
+                                fixes.append((key, value))
+                                log_warning("Fixed duplicate data URI prefix in key '%s'", key)
+                                comma = value.find(",")
+                        
                         # Check if it's a valid data URI format
-                        if ";" not in value or "," not in value:
-                            logger.error(f"Invalid data URI format in key '{key}': missing separator")
+                        if comma == -1 or ";" not in value:
+                            log_error("Invalid data URI format in key '%s': missing separator", key)
                             continue
                         
-                        # Extract the base64 part
-                        header, base64_data = value.split(",", 1)
+                        # Small values are not worth a probe
+                        if len(value) < MIN_BASE64_PROBE_LEN:
+                            continue
                         
-                        # Validate base64 data
+                        # Validate the base64 part, slicing only the probed head instead of copying the payload
+                        base64_data = value[comma + 1:comma + 1 + BASE64_PROBE_CHARS]
                         if base64_data:
-                            # Try to decode a small portion to validate base64
-                            test_data = base64_data[:100]  # Test first 100 chars
                             try:
-                                import base64 as base64_module
-                                base64_module.b64decode(test_data + "=" * (-len(test_data) % 4))
+                                probe_base64(base64_data)
                             except Exception as e:
-                                logger.error(f"Invalid base64 data in key '{key}': {str(e)}")
+                                log_error("Invalid base64 data in key '%s': %s", key, e)
                                 # Remove the invalid base64 string
-                                data[key] = f"[INVALID_BASE64: {str(e)}]"
-                        
-                    except Exception as e:
-                        logger.error(f"Error validating base64 in key '{key}': {str(e)}")
+                                fixes.append((key, f"[INVALID_BASE64: {str(e)}]"))
+                    
+                    # Check if it looks like raw base64 data (common keys for images)
+                    elif len(value) >= MIN_BASE64_PROBE_LEN and key.lower() in RAW_BASE64_KEYS:
+                        try:
+                            probe_base64(value)
+                            log_info("Validated raw base64 data in key '%s' (%d chars)", key, len(value))
+                        except Exception as e:
+                            # Keep the data as is, but log the error
+                            log_error("Invalid raw base64 data in key '%s': %s", key, e)
                 
-                # Check if it looks like raw base64 data (common keys for images)
-                elif key.lower() in ['bar_chart', 'line_chart', 'scatter_plot', 'histogram', 'pie_chart', 'graph', 'chart', 'image'] and len(value) > 100:
-                    try:
-                        # Try to decode a small portion to validate base64
-                        test_data = value[:100]  # Test first 100 chars
-                        import base64 as base64_module
-                        base64_module.b64decode(test_data + "=" * (-len(test_data) % 4))
-                        logger.info(f"Validated raw base64 data in key '{key}' ({len(value)} chars)")
-                    except Exception as e:
-                        logger.error(f"Invalid raw base64 data in key '{key}': {str(e)}")
-                        # Keep the data as is, but log the error
-                        pass
-                        
-            elif isinstance(value, (dict, list)):
-                # Recursively check nested structures
-                validate_base64_integrity(value)
-    elif isinstance(data, list):
-        for item in data:
-            if isinstance(item, (dict, list)):
-                validate_base64_integrity(item)
+                elif value_type is _dict or value_type is _list:
+                    # Check nested structures
+                    push(value)
+            if fixes:
+                container.update(fixes)
+        elif container_type is _list:
+            for item in container:
+                item_type = _type(item)
+                if item_type is _dict or item_type is _list:
+                    push(item)
     return data
 
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson for faster serialization of large results.
+    Falls back to the default provider for values orjson cannot encode.
+    """
+    
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    sort_keys = False  # Preserve key order on the fallback path too
+    
+    def _orjson_bytes(self, obj):
+        try:
+            return orjson.dumps(obj, option=self.ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().dumps(obj).encode('utf-8')
+    
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_bytes(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson_bytes(obj), mimetype=self.mimetype)
+
+class InMemoryUploadRequest(Request):
+    """Request that keeps multipart file uploads in memory up to MAX_IN_MEMORY_UPLOAD"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= MAX_IN_MEMORY_UPLOAD:
+            return io.BytesIO()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
 # Initialize logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+app.request_class = InMemoryUploadRequest
 
 # Configure Flask for larger responses
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB limit
-app.config['JSON_SORT_KEYS'] = False  # Preserve key order
+app.config['MAX_CONTENT_LENGTH'] = MAX_IN_MEMORY_UPLOAD  # 16MB limit
 
 # Enable CORS for all routes with fully open configuration
 CORS(app, resources={r"/*": {"origins": "*"}})
 
+@app.before_request
+def attach_orchestrator():
+    """Acquire this thread's orchestrator before the upload handler runs, so it never builds one itself"""
+    if request.endpoint == 'api_file_upload':
+        g.orchestrator = get_orchestrator()
+
 @app.route('/api/', methods=['POST'])
 def api_file_upload():
     """
@@ -150,46 +308,57 @@ def api_file_upload():
     questions.txt will ALWAYS be sent and contain the questions. There may be zero or more additional files passed.
     """
     
-    # Initialize orchestrator agent (new for each request)
-    orchestrator = OrchestratorAgent()
+    # This thread's orchestrator agent with a fresh context (see attach_orchestrator)
+    orchestrator = g.orchestrator
 
-    # Start timer for this request
-    start_time = time.time()
+    # Start timer for this request (monotonic, so clock adjustments can't skew the time budget)
+    start_time = time.monotonic()
     max_retry_time = 4 * 60  # 4 minutes in seconds
     
     try:
+        files = request.files
+        
         # Check if questions.txt was uploaded (this is required)
-        if 'questions.txt' not in request.files:
+        if 'questions.txt' not in files:
             return jsonify({"error": "questions.txt file is required. Please upload a text file with your questions."}), 400
         
-        questions_file = request.files['questions.txt']
+        questions_file = files['questions.txt']
         
         # Check if questions.txt was selected
         if questions_file.filename == '':
             return jsonify({"error": "questions.txt file not selected"}), 400
         
         # Check if questions.txt is a text file
-        if not questions_file.filename.lower().endswith(('.txt', '.text')):
+        if Path(questions_file.filename).suffix.lower() not in ALLOWED_QUESTIONS_EXTENSIONS:
             return jsonify({"error": "questions.txt must be a text file (.txt)"}), 400
         
-        # Read the questions file content
+        # Reject binary uploads from the first bytes instead of after a full decode
+        if not looks_like_text_upload(questions_file):
+            return jsonify({"error": "questions.txt must be a UTF-8 text file"}), 415
+        
+        # Read the questions file once (capped at MAX_QUESTIONS_BYTES), strip at the byte level and decode once
         try:
-            questions_content = questions_file.read().decode('utf-8').strip()
+            raw = questions_file.stream.read(MAX_QUESTIONS_BYTES + 1)
+            if len(raw) > MAX_QUESTIONS_BYTES:
+                return jsonify({"error": f"questions.txt is too large (limit: {MAX_QUESTIONS_BYTES} bytes)"}), 413
+            questions_content = raw.strip().decode('utf-8') if raw else ''
         except UnicodeDecodeError:
             return jsonify({"error": "Unable to read questions.txt. Please ensure it's a valid text file."}), 400
+        finally:
+            questions_file.stream.seek(0)
         
         if not questions_content:
             return jsonify({"error": "questions.txt file is empty"}), 400
         
         # Collect additional files (optional)
-        additional_files = {}
-        for filename, file_obj in request.files.items():
-            if filename != 'questions.txt' and file_obj.filename != '':
-                additional_files[filename] = file_obj
+        additional_files = {
+            filename: file_obj for filename, file_obj in files.items()
+            if filename != 'questions.txt' and file_obj.filename
+        }
         
-        logger.info(f"Received questions file: {questions_file.filename}")
-        logger.info(f"Questions content: {questions_content}")
-        logger.info(f"Additional files: {list(additional_files.keys())}")
+        logger.info("Received questions file: %s (%d characters)", questions_file.filename, len(questions_content))
+        logger.debug("Questions content: %s", questions_content[:MAX_LOG_STR])
+        logger.info("Additional files: %s", ", ".join(additional_files))
         
         # Retry logic for orchestrator
         max_retries = 5
@@ -198,9 +367,9 @@ def api_file_upload():
         while retry_count < max_retries:
             try:
                 # Check if we've exceeded the time limit
-                elapsed_time = time.time() - start_time
+                elapsed_time = time.monotonic() - start_time
                 if elapsed_time >= max_retry_time:
-                    logger.error(f"Request exceeded {max_retry_time} seconds, returning error")
+                    logger.error("Request exceeded %d seconds, returning error", max_retry_time)
                     return jsonify({
                         "status": "error",
                         "error": f"Request processing exceeded time limit of {max_retry_time} seconds"
@@ -208,85 +377,92 @@ def api_file_upload():
                 
                 # Process the question with additional files
                 result = orchestrator.process_question(questions_content, additional_files)
+                elapsed_time = time.monotonic() - start_time
                 
                 # Check if the orchestrator returned an error
                 if isinstance(result, dict) and result.get("status") == "error":
-                    elapsed_time = time.time() - start_time
                     if elapsed_time < max_retry_time and retry_count < max_retries - 1:
                         retry_count += 1
-                        logger.warning(f"Orchestrator failed (attempt {retry_count}/{max_retries}): {result.get('error')}. Retrying...")
+                        logger.warning("Orchestrator failed (attempt %d/%d): %s. Retrying...", retry_count, max_retries, result.get('error'))
+                        wait_before_retry(retry_count, start_time, max_retry_time)
                         continue
                     else:
-                        logger.error(f"Orchestrator failed after {retry_count + 1} attempts: {result.get('error')}")
+                        logger.error("Orchestrator failed after %d attempts: %s", retry_count + 1, result.get('error'))
                         return jsonify(result), 500
                 elif result is False:
-                    elapsed_time = time.time() - start_time
                     if elapsed_time < max_retry_time and retry_count < max_retries - 1:
                         retry_count += 1
-                        logger.warning(f"Orchestrator returned False (attempt {retry_count}/{max_retries}). Retrying...")
+                        logger.warning("Orchestrator returned False (attempt %d/%d). Retrying...", retry_count, max_retries)
+                        wait_before_retry(retry_count, start_time, max_retry_time)
                         continue
                     else:
-                        logger.error(f"Orchestrator returned False after {retry_count + 1} attempts")
+                        logger.error("Orchestrator returned False after %d attempts", retry_count + 1)
                         return jsonify(result), 500
                 else:
                     # Success case
-                    elapsed_time = time.time() - start_time
-                    logger.info(f"Request completed successfully in {elapsed_time:.2f} seconds after {retry_count + 1} attempts")
+                    logger.info("Request completed successfully in %.2f seconds after %d attempts", elapsed_time, retry_count + 1)
                     
-                    # Log response size for debugging
-                    result_str = str(result)
-                    logger.info(f"Result length: {len(result_str)} characters")
+                    # Responses without any data URI (e.g. plain text answers) skip base64 validation
+                    needs_base64_validation, serialized = scan_for_data_uri(result)
                     
-                    if len(result_str) > 100000:
-                        logger.warning(f"Response is very large ({len(result_str)} chars), may cause issues")
+                    # If result is a JSON string, parse it so it is returned directly (generic approach)
+                    if isinstance(result, str) and JSON_OBJECT_START.match(result):
+                        try:
+                            result = orjson.loads(result)
+                            logger.info("Parsed JSON result, returning directly")
+                        except orjson.JSONDecodeError:
+                            logger.warning("Failed to parse result as JSON, returning wrapped")
                     
-                    # Validate base64 integrity for response
-                    if isinstance(result, dict):
-                        result = validate_base64_integrity(result)
+                    # Fix and validate base64 data for the response in one pass
+                    base64_validated = 'skipped'
+                    if isinstance(result, dict) and needs_base64_validation:
+                        result = validate_base64(result)
+                        base64_validated = 'true'
                         logger.info("Validated base64 data in response")
                     
-                    # If result is a JSON string, parse and return directly (generic approach)
-                    if isinstance(result, str) and result.strip().startswith('{'):
-                        try:
-                            parsed_result = json.loads(result)
-                            # Validate base64 data in parsed result
-                            parsed_result = validate_base64_integrity(parsed_result)
-                            logger.info("Parsed JSON result, validated base64 data, returning directly")
-                            response = jsonify(parsed_result)
-                            response.headers['X-Base64-Validated'] = 'true'
-                            return response
-                        except json.JSONDecodeError:
-                            logger.warning("Failed to parse result as JSON, returning wrapped")
+                    # Add validation header; an unchanged result reuses the bytes serialized for the scan
+                    if serialized is not None and not needs_base64_validation:
+                        response = app.response_class(serialized, mimetype=app.json.mimetype)
+                    else:
+                        response = jsonify(result)
+                    response.headers['X-Base64-Validated'] = base64_validated
+                    
+                    # Log response size for debugging, from the body that was already serialized
+                    size_bytes = response.calculate_content_length() or 0
+                    logger.info("Response size: %d bytes", size_bytes)
+                    
+                    if size_bytes > 100000:
+                        logger.warning("Response is very large (%d bytes), may cause issues", size_bytes)
                     
-                    # Add validation header for direct dict responses
-                    response = jsonify(result)
-                    response.headers['X-Base64-Validated'] = 'true'
                     return response
                     
             except Exception as orchestrator_error:
-                elapsed_time = time.time() - start_time
+                elapsed_time = time.monotonic() - start_time
                 if elapsed_time < max_retry_time and retry_count < max_retries - 1:
                     retry_count += 1
-                    logger.warning(f"Orchestrator exception (attempt {retry_count}/{max_retries}): {str(orchestrator_error)}. Retrying...")
+                    logger.warning("Orchestrator exception (attempt %d/%d): %s. Retrying...", retry_count, max_retries, orchestrator_error)
+                    # Every exception backs off: ValueError/KeyError here usually come from malformed LLM
+                    # output (e.g. JSONDecodeError), which a later attempt can fix
+                    wait_before_retry(retry_count, start_time, max_retry_time)
                     continue
                 else:
-                    logger.error(f"Orchestrator exception after {retry_count + 1} attempts: {str(orchestrator_error)}")
+                    logger.error("Orchestrator exception after %d attempts: %s", retry_count + 1, orchestrator_error)
                     return jsonify({
                         "status": "error",
                         "error": f"Processing failed after multiple attempts: {str(orchestrator_error)}"
                     }), 500
         
         # If we get here, we've exhausted all retries
-        elapsed_time = time.time() - start_time
-        logger.error(f"Exhausted all {max_retries} retries after {elapsed_time:.2f} seconds")
+        elapsed_time = time.monotonic() - start_time
+        logger.error("Exhausted all %d retries after %.2f seconds", max_retries, elapsed_time)
         return jsonify({
             "status": "error",
             "error": f"Processing failed after {max_retries} attempts within time limit"
         }), 500
         
     except Exception as e:
-        elapsed_time = time.time() - start_time
-        logger.error(f"Error in api_file_upload endpoint after {elapsed_time:.2f} seconds: {str(e)}")
+        elapsed_time = time.monotonic() - start_time
+        logger.error("Error in api_file_upload endpoint after %.2f seconds: %s", elapsed_time, e)
         return jsonify({
             "status": "error",
             "error": str(e)
@@ -23,9 +23,17 @@ REPORTS_DIR = STORAGE_DIR / 'reports'
 DOWNLOADS_DIR = STORAGE_DIR / 'downloads'
 LOGS_DIR = BASE_DIR / 'logs'
 
-# Ensure directories exist
-for directory in [STORAGE_DIR, SCRAPED_DIR, REPORTS_DIR, DOWNLOADS_DIR, LOGS_DIR]:
-    directory.mkdir(exist_ok=True)
+# Set once ensure_dirs() has created the directories, so later calls are free
+_DIRS_READY = False
+
+def ensure_dirs():
+    """Ensure the storage and log directories exist (called at app startup, not on import)"""
+    global _DIRS_READY
+    if _DIRS_READY:
+        return
+    for directory in (STORAGE_DIR, SCRAPED_DIR, REPORTS_DIR, DOWNLOADS_DIR, LOGS_DIR):
+        os.makedirs(directory, exist_ok=True)
+    _DIRS_READY = True
 
 # LLM Configuration
 LLM_API_KEY = os.getenv('LLM_API_KEY')
\ No newline at end of file
@@ -1,10 +1,73 @@
+import fnmatch
+import mmap
 import os
-import base64
+import re
+import shutil
+import time
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Set, Tuple, Union
 from io import BytesIO
 import json
+import logging
+import orjson
+from cachetools import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# SIMD-accelerated base64 when available, stdlib otherwise (same encode/decode API).
+# pybase64 is a binding of libbase64 with runtime CPU dispatch (AVX2/SSSE3/NEON), and
+# convert_file_to_base64 feeds it an mmap of the file, so no custom C extension is needed.
+try:
+    import pybase64 as base64
+    b64encode_to_str = base64.b64encode_as_string
+except ImportError:
+    import base64
+
+    def b64encode_to_str(data: bytes) -> str:
+        """Base64-encode bytes straight to an ASCII string"""
+        return base64.b64encode(data).decode('ascii')
+
+# MIME types for data URIs, keyed by lowercase extension without the dot
+MIME_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'pdf': 'application/pdf',
+    'csv': 'text/csv',
+    'txt': 'text/plain',
+    'json': 'application/json'
+}
+
+# Data URI prefixes per extension, built once; joining one to the base64 string is a single copy
+DATA_URI_PREFIXES = {ext: f"data:{mime_type};base64," for ext, mime_type in MIME_TYPES.items()}
+DEFAULT_DATA_URI_PREFIX = "data:application/octet-stream;base64,"
+
+# Extensions of files the file manager hands out by name (see is_filename)
+FILENAME_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.pdf', '.csv', '.txt', '.json')
+
+# Characters stripped from names of saved files (keeps letters, digits, '.', '_' and '-')
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.-]')
+
+# Leading whitespace then "{" or "[": the formatted response is a JSON document
+JSON_DOCUMENT_START = re.compile(r'\s*[\[{]')
+
+# Chunk size used when copying uploads to storage
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+# Maximum uploads written to storage concurrently
+MAX_CONCURRENT_SAVES = 8
+
+# Maximum stored files read and encoded concurrently for one response
+MAX_CONCURRENT_READS = 8
+
+# Raw base64 of stored files keyed by (path, mtime_ns, size), so a file that is referenced
+# several times or re-sent across retries is only read and encoded once. Bounded by total characters.
+BASE64_CACHE = LRUCache(maxsize=64 * 1024 * 1024, getsizeof=len)
+BASE64_CACHE_LOCK = threading.Lock()
 
 class FileManager:
     """
@@ -27,9 +90,13 @@ class FileManager:
     
     def _generate_timestamped_filename(self, original_filename: str, prefix: str = "") -> str:
         """Generate a timestamped filename to avoid collisions"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]  # Include milliseconds
+        # YYYYmmdd_HHMMSS_mmm (local time, with milliseconds) from integer math instead of strftime
+        now_ns = time.time_ns()
+        t = time.localtime(now_ns // 1_000_000_000)
+        millis = (now_ns // 1_000_000) % 1000
+        timestamp = f"{t.tm_year}{t.tm_mon:02d}{t.tm_mday:02d}_{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}_{millis:03d}"
         name, ext = os.path.splitext(original_filename)
-        safe_name = "".join(c for c in name if c.isalnum() or c in "._-")[:50]  # Sanitize and limit length
+        safe_name = UNSAFE_FILENAME_CHARS.sub('', name)[:50]  # Sanitize and limit length
         
         if prefix:
             return f"{prefix}_{timestamp}_{safe_name}{ext}"
@@ -39,6 +106,7 @@ class FileManager:
     def save_uploaded_file(self, filename: str, file_obj) -> str:
         """
         Save an uploaded file (from user) to storage.
+        The file is rewound before copying but left at its end afterwards; callers must seek before reading it again.
         
         Args:
             filename: Original filename
@@ -55,18 +123,15 @@ class FileManager:
             saved_filename = self._generate_timestamped_filename(filename, "upload")
             file_path = os.path.join(self.storage_dir, saved_filename)
             
-            # Save the file
+            # Save the file in 1 MiB chunks instead of reading it into memory whole
             with open(file_path, 'wb') as f:
-                f.write(file_obj.read())
-            
-            # Reset file pointer for potential future use
-            file_obj.seek(0)
+                shutil.copyfileobj(file_obj, f, length=UPLOAD_COPY_BUFFER)
             
-            print(f"Saved uploaded file: {filename} -> {saved_filename}")
+            logger.debug("Saved uploaded file: %s -> %s", filename, saved_filename)
             return saved_filename
             
         except Exception as e:
-            print(f"Error saving uploaded file {filename}: {str(e)}")
+            logger.error("Error saving uploaded file %s: %s", filename, e)
             raise
     
     def save_generated_file(self, filename: str, content: Union[bytes, str], file_type: str = "generated") -> str:
@@ -93,11 +158,11 @@ class FileManager:
             with open(file_path, mode, encoding=encoding) as f:
                 f.write(content)
             
-            print(f"Saved generated file: {filename} -> {saved_filename}")
+            logger.debug("Saved generated file: %s -> %s", filename, saved_filename)
             return saved_filename
             
         except Exception as e:
-            print(f"Error saving generated file {filename}: {str(e)}")
+            logger.error("Error saving generated file %s: %s", filename, e)
             raise
     
     def save_image_from_base64(self, base64_data: str, filename: str = "image.png") -> str:
@@ -119,13 +184,13 @@ class FileManager:
                 base64_content = base64_data
             
             # Decode base64 to bytes
-            image_bytes = base64.b64decode(base64_content)
+            image_bytes = base64.b64decode(base64_content, validate=True)
             
             # Save using save_generated_file
             return self.save_generated_file(filename, image_bytes, "image")
             
         except Exception as e:
-            print(f"Error saving base64 image {filename}: {str(e)}")
+            logger.error("Error saving base64 image %s: %s", filename, e)
             raise
     
     def get_file_path(self, filename: str) -> str:
@@ -149,18 +214,24 @@ class FileManager:
         List files in storage, optionally filtered by pattern.
         
         Args:
-            pattern: Optional pattern to filter filenames
+            pattern: Optional pattern to filter filenames (a glob if it contains *, ? or [, otherwise a substring)
             
         Returns:
             List[str]: List of filenames
         """
         try:
-            files = os.listdir(self.storage_dir)
-            if pattern:
-                files = [f for f in files if pattern in f]
-            return sorted(files)
+            # scandir yields the file type with each entry, so no extra stat per file
+            with os.scandir(self.storage_dir) as entries:
+                if pattern and any(c in pattern for c in '*?['):
+                    files = [e.name for e in entries if e.is_file(follow_symlinks=False) and fnmatch.fnmatchcase(e.name, pattern)]
+                elif pattern:
+                    files = [e.name for e in entries if e.is_file(follow_symlinks=False) and pattern in e.name]
+                else:
+                    files = [e.name for e in entries if e.is_file(follow_symlinks=False)]
+            files.sort()
+            return files
         except Exception as e:
-            print(f"Error listing files: {str(e)}")
+            logger.error("Error listing files: %s", e)
             return []
     
     def read_file(self, filename: str, mode: str = 'rb') -> Union[bytes, str]:
@@ -182,7 +253,7 @@ class FileManager:
                 return f.read()
                 
         except Exception as e:
-            print(f"Error reading file {filename}: {str(e)}")
+            logger.error("Error reading file %s: %s", filename, e)
             raise
     
     def convert_file_to_base64(self, filename: str, raw_base64: bool = False) -> str:
@@ -199,41 +270,45 @@ class FileManager:
         try:
             file_path = self.get_file_path(filename)
             
-            # Read file as bytes
-            with open(file_path, 'rb') as f:
-                file_bytes = f.read()
-            
-            # Encode to base64
-            base64_data = base64.b64encode(file_bytes).decode('utf-8')
+            # A changed file gets a new mtime/size, so stale entries are never served
+            stat = os.stat(file_path)
+            cache_key = (file_path, stat.st_mtime_ns, stat.st_size)
+            with BASE64_CACHE_LOCK:
+                base64_data = BASE64_CACHE.get(cache_key)
+            
+            if base64_data is None:
+                # Encode straight from a read-only mapping of the file, so its bytes are never
+                # copied onto the heap; only the encoded string is allocated (mmap rejects empty files)
+                with open(file_path, 'rb') as f:
+                    if stat.st_size:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                            base64_data = b64encode_to_str(mapped)
+                    else:
+                        base64_data = ''
+                with BASE64_CACHE_LOCK:
+                    try:
+                        BASE64_CACHE[cache_key] = base64_data
+                    except ValueError:
+                        # Larger than the whole cache; just don't keep it
+                        pass
             
             # If raw base64 requested, return just the base64 data
             if raw_base64:
-                print(f"Converted {filename} to raw base64 ({len(base64_data)} chars)")
+                logger.debug("Converted %s to raw base64 (%d chars)", filename, len(base64_data))
                 return base64_data
             
-            # Determine MIME type based on extension
-            ext = os.path.splitext(filename)[1].lower()
-            mime_type_map = {
-                '.png': 'image/png',
-                '.jpg': 'image/jpeg', 
-                '.jpeg': 'image/jpeg',
-                '.gif': 'image/gif',
-                '.pdf': 'application/pdf',
-                '.csv': 'text/csv',
-                '.txt': 'text/plain',
-                '.json': 'application/json'
-            }
-            
-            mime_type = mime_type_map.get(ext, 'application/octet-stream')
+            # Pick the precomputed data URI prefix for the extension
+            ext = filename.rpartition('.')[2].lower()
+            prefix = DATA_URI_PREFIXES.get(ext, DEFAULT_DATA_URI_PREFIX)
             
             # Create data URI
-            data_uri = f"data:{mime_type};base64,{base64_data}"
+            data_uri = prefix + base64_data
             
-            print(f"Converted {filename} to base64 data URI ({len(data_uri)} chars)")
+            logger.debug("Converted %s to base64 data URI (%d chars)", filename, len(data_uri))
             return data_uri
             
         except Exception as e:
-            print(f"Error converting file {filename} to base64: {str(e)}")
+            logger.error("Error converting file %s to base64: %s", filename, e)
             raise
     
     def get_file_info(self, filename: str) -> Dict[str, Any]:
@@ -249,11 +324,12 @@ class FileManager:
         try:
             file_path = self.get_file_path(filename)
             
-            if not os.path.exists(file_path):
+            # A single stat both checks existence and provides the metadata
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
                 return {"exists": False}
             
-            stat = os.stat(file_path)
-            
             return {
                 "exists": True,
                 "filename": filename,
@@ -264,7 +340,7 @@ class FileManager:
             }
             
         except Exception as e:
-            print(f"Error getting file info for {filename}: {str(e)}")
+            logger.error("Error getting file info for %s: %s", filename, e)
             return {"exists": False, "error": str(e)}
     
     def cleanup_old_files(self, max_age_hours: int = 24):
@@ -275,24 +351,25 @@ class FileManager:
             max_age_hours: Maximum age in hours before files are deleted
         """
         try:
-            import time
-            
             current_time = time.time()
             cutoff_time = current_time - (max_age_hours * 3600)
             
+            # One scandir pass: the entry carries its type and caches its stat
             deleted_count = 0
-            for filename in os.listdir(self.storage_dir):
-                file_path = os.path.join(self.storage_dir, filename)
-                if os.path.isfile(file_path):
-                    if os.path.getmtime(file_path) < cutoff_time:
-                        os.remove(file_path)
-                        deleted_count += 1
-                        print(f"Deleted old file: {filename}")
-            
-            print(f"Cleanup completed: {deleted_count} files deleted")
+            with os.scandir(self.storage_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff_time:
+                            os.unlink(entry.path)
+                            deleted_count += 1
+                    except FileNotFoundError:
+                        # Removed concurrently; nothing left to clean up
+                        pass
+            
+            logger.info("Cleanup completed: %d files deleted", deleted_count)
             
         except Exception as e:
-            print(f"Error during cleanup: {str(e)}")
+            logger.error("Error during cleanup: %s", e)
     
     def get_files_for_analysis(self, uploaded_files: Dict[str, Any]) -> Dict[str, str]:
         """
@@ -310,15 +387,22 @@ class FileManager:
         if not uploaded_files:
             return file_mapping
         
-        for original_filename, file_obj in uploaded_files.items():
-            try:
-                saved_filename = self.save_uploaded_file(original_filename, file_obj)
-                file_mapping[original_filename] = saved_filename
-                print(f"Processed file for analysis: {original_filename} -> {saved_filename}")
-            except Exception as e:
-                print(f"Error processing file {original_filename}: {str(e)}")
-                # Continue with other files
-                continue
+        # Save files concurrently (the GIL is released during disk writes); results are
+        # collected in upload order so the mapping order matches the single-threaded version
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_SAVES, len(uploaded_files))) as executor:
+            futures = {
+                original_filename: executor.submit(self.save_uploaded_file, original_filename, file_obj)
+                for original_filename, file_obj in uploaded_files.items()
+            }
+            for original_filename, future in futures.items():
+                try:
+                    saved_filename = future.result()
+                    file_mapping[original_filename] = saved_filename
+                    logger.debug("Processed file for analysis: %s -> %s", original_filename, saved_filename)
+                except Exception as e:
+                    logger.error("Error processing file %s: %s", original_filename, e)
+                    # Continue with other files
+                    continue
         
         return file_mapping
     
@@ -339,20 +423,20 @@ class FileManager:
             if isinstance(value, str) and value.startswith("data:image/"):
                 # This is a base64 image - save it and replace with filename
                 # NOTE: This should NOT happen if analysis agent is working correctly
-                print(f"WARNING: Found base64 data in analysis results for key '{key}' - this should be a filename!")
+                logger.warning("Found base64 data in analysis results for key '%s' - this should be a filename!", key)
                 try:
                     # Generate a meaningful filename based on the key
                     image_filename = f"analysis_{key}.png"
                     saved_filename = self.save_image_from_base64(value, image_filename)
                     processed_results[key] = saved_filename
-                    print(f"Saved analysis image: {key} -> {saved_filename}")
+                    logger.debug("Saved analysis image: %s -> %s", key, saved_filename)
                 except Exception as e:
-                    print(f"Error saving analysis image {key}: {str(e)}")
+                    logger.error("Error saving analysis image %s: %s", key, e)
                     # Keep original value if save fails
                     processed_results[key] = value
             elif isinstance(value, str) and self.is_filename(value):
                 # This is already a filename - perfect!
-                print(f"Found filename in analysis results: {key} -> {value}")
+                logger.debug("Found filename in analysis results: %s -> %s", key, value)
                 processed_results[key] = value
             else:
                 # Keep other values as-is
@@ -364,12 +448,13 @@ class FileManager:
         """Check if a string looks like a saved filename from our file manager"""
         if not isinstance(value, str):
             return False
-        # Check if it looks like a timestamped filename from our file manager
-        return (value.endswith(('.png', '.jpg', '.jpeg', '.pdf', '.csv', '.txt', '.json')) and 
-                ('_' in value) and 
-                len(value) > 10)
+        # Check if it looks like a timestamped filename from our file manager.
+        # Constant-time checks come first so long text values are rejected without a scan.
+        return (len(value) > 10 and 
+                value.endswith(FILENAME_EXTENSIONS) and 
+                ('_' in value))
     
-    def convert_files_in_response(self, data: Dict[str, Any], formatted_response: str) -> str:
+    def convert_files_in_response(self, data: Dict[str, Any], formatted_response: str, known_files: Optional[Set[str]] = None) -> str:
         """
         Convert file references in a formatted response to base64 data URIs.
         This is the final step before sending data back to the user.
@@ -377,65 +462,14 @@ class FileManager:
         Args:
             data: Original data containing file references
             formatted_response: The formatted response string
+            known_files: Filenames already collected by filter_data_for_llm; skips re-scanning data
             
         Returns:
             str: Response with file references converted to base64 data URIs
         """
-        import re
-        
-        # Find all file references in the original data
-        file_references = []
-        
-        if isinstance(data, dict):
-            # Check regular dict keys
-            for key, value in data.items():
-                if isinstance(value, str) and self.is_filename(value):
-                    file_references.append((key, value))
-            
-            # Check _list_data if it exists
-            if "_list_data" in data:
-                for i, item in enumerate(data["_list_data"]):
-                    if isinstance(item, str) and self.is_filename(item):
-                        file_references.append((f"list_item_{i}", item))
-        
-        print(f"Converting {len(file_references)} file references to base64 for final output")
-        
-        # Convert each file to base64 and replace in response
-        for key, filename in file_references:
-            try:
-                # Convert file to base64 data URI
-                data_uri = self.convert_file_to_base64(filename)
-                
-                # Escape quotes in the data URI for JSON safety
-                escaped_uri = data_uri.replace('"', '\\"')
-                
-                # Replace file reference placeholders
-                placeholder_patterns = [
-                    rf'\[FILE_AVAILABLE: {re.escape(filename)}\]',
-                    rf'"{re.escape(filename)}"',
-                    rf'{re.escape(filename)}'
-                ]
-                
-                replaced = False
-                for pattern in placeholder_patterns:
-                    if re.search(pattern, formatted_response):
-                        # Always use proper JSON string format
-                        formatted_response = re.sub(pattern, f'"{escaped_uri}"', formatted_response)
-                        replaced = True
-                        print(f"Replaced file {filename} with base64 data URI in final output")
-                        break
-                
-                if not replaced:
-                    print(f"Warning: No placeholder found for file {filename}")
-                    
-            except Exception as e:
-                print(f"Error converting file {filename} to base64: {e}")
-                # Keep the original filename if conversion fails
-                continue
-                            
-        return formatted_response
+        return self._convert_files_in_response(data, formatted_response, raw_base64=False, known_files=known_files)
 
-    def convert_files_in_response_to_raw_base64(self, data: Dict[str, Any], formatted_response: str) -> str:
+    def convert_files_in_response_to_raw_base64(self, data: Dict[str, Any], formatted_response: str, known_files: Optional[Set[str]] = None) -> str:
         """
         Convert file references in a formatted response to raw base64 data (without data URI prefix).
         This is specifically for API responses where the test framework expects raw base64.
@@ -443,16 +477,29 @@ class FileManager:
         Args:
             data: Original data containing file references
             formatted_response: The formatted response string
+            known_files: Filenames already collected by filter_data_for_llm; skips re-scanning data
             
         Returns:
             str: Response with file references converted to raw base64 data
         """
-        import re
+        return self._convert_files_in_response(data, formatted_response, raw_base64=True, known_files=known_files)
+
+    def _convert_files_in_response(self, data: Dict[str, Any], formatted_response: str, raw_base64: bool,
+                                   known_files: Optional[Set[str]] = None) -> str:
+        """
+        Replace every file reference in the response.
+        JSON responses are converted at the object level and re-serialized by orjson;
+        other text is rewritten in a single regex pass.
+        """
+        output_kind = "raw base64" if raw_base64 else "base64 data URI"
         
         # Find all file references in the original data
         file_references = []
         
-        if isinstance(data, dict):
+        if known_files is not None:
+            # Already collected while filtering the data for the LLM
+            file_references = [(filename, filename) for filename in known_files]
+        elif isinstance(data, dict):
             # Check regular dict keys
             for key, value in data.items():
                 if isinstance(value, str) and self.is_filename(value):
@@ -464,50 +511,147 @@ class FileManager:
                     if isinstance(item, str) and self.is_filename(item):
                         file_references.append((f"list_item_{i}", item))
         
-        print(f"Converting {len(file_references)} file references to raw base64 for API output")
+        logger.info("Converting %d file references to %s for final output", len(file_references), output_kind)
         
-        # Convert each file to raw base64 and replace in response
-        for key, filename in file_references:
+        filenames = {filename for key, filename in file_references}
+        if not filenames:
+            return formatted_response
+        
+        # Encode files that actually appear in the response up front (concurrently when there are
+        # several); anything left is encoded on its first match by whichever path runs below
+        referenced = [filename for filename in filenames if filename in formatted_response]
+        encoded_files, failed = self._encode_files_concurrently(referenced, raw_base64, output_kind)
+        
+        # JSON documents: replace values object-wise and let orjson handle escaping, instead of splicing text
+        if JSON_DOCUMENT_START.match(formatted_response):
             try:
-                # Convert file to raw base64 (without data URI prefix)
-                raw_base64 = self.convert_file_to_base64(filename, raw_base64=True)
-                
-                # Escape quotes in the base64 data for JSON safety
-                escaped_base64 = raw_base64.replace('"', '\\"')
-                
-                # Replace file reference placeholders
-                placeholder_patterns = [
-                    rf'\[FILE_AVAILABLE: {re.escape(filename)}\]',
-                    rf'"{re.escape(filename)}"',
-                    rf'{re.escape(filename)}'
-                ]
-                
-                replaced = False
-                for pattern in placeholder_patterns:
-                    if re.search(pattern, formatted_response):
-                        # Always use proper JSON string format
-                        formatted_response = re.sub(pattern, f'"{escaped_base64}"', formatted_response)
-                        replaced = True
-                        print(f"Replaced file {filename} with raw base64 data in API output")
-                        break
-                
-                if not replaced:
-                    print(f"Warning: No placeholder found for file {filename}")
-                    
-            except Exception as e:
-                print(f"Error converting file {filename} to raw base64: {e}")
-                # Keep the original filename if conversion fails
-                continue
+                response_obj = orjson.loads(formatted_response)
+            except orjson.JSONDecodeError:
+                response_obj = None
+            if isinstance(response_obj, (dict, list)):
+                return self._convert_files_in_object(response_obj, filenames, raw_base64, output_kind,
+                                                     encoded_files, failed)
+        
+        # One alternation covers the placeholder, quoted and bare forms of every filename.
+        # Longer names go first so a name that is a prefix of another can't steal its match.
+        names = "|".join(re.escape(f) for f in sorted(filenames, key=len, reverse=True))
+        pattern = re.compile(rf'\[FILE_AVAILABLE: ({names})\]|"({names})"|({names})')
+        
+        # Files not encoded up front are read and encoded inside the single substitution pass, on their
+        # first match. Each is wrapped as a JSON string once and reused; base64 and data URIs never
+        # contain quotes or backslashes, so no JSON escaping is needed.
+        quoted_files = {}
+        replaced = set()
+        
+        def replace_reference(match):
+            filename = match.group(1) or match.group(2) or match.group(3)
+            quoted = quoted_files.get(filename)
+            if quoted is None:
+                if filename in failed:
+                    return match.group(0)
+                encoded = encoded_files.get(filename)
+                if encoded is None:
+                    try:
+                        encoded = encoded_files[filename] = self.convert_file_to_base64(filename, raw_base64=raw_base64)
+                    except Exception as e:
+                        logger.error("Error converting file %s to %s: %s", filename, output_kind, e)
+                        # Keep the original filename if conversion fails
+                        failed.add(filename)
+                        return match.group(0)
+                quoted = quoted_files[filename] = f'"{encoded}"'
+            replaced.add(filename)
+            return quoted
+        
+        formatted_response = pattern.sub(replace_reference, formatted_response)
+        
+        for filename in filenames - failed:
+            if filename in replaced:
+                logger.debug("Replaced file %s with %s in final output", filename, output_kind)
+            else:
+                logger.warning("No placeholder found for file %s", filename)
                             
         return formatted_response
     
-    def filter_data_for_llm(self, data: Any) -> Any:
+    def _encode_files_concurrently(self, filenames: List[str], raw_base64: bool, output_kind: str) -> Tuple[Dict[str, str], Set[str]]:
+        """
+        Read and encode several files concurrently, so disk reads overlap (file I/O and pybase64
+        encoding release the GIL). Fewer than two files are left for lazy encoding.
+        Returns the encodings by filename and the set of filenames that failed.
+        """
+        encoded_files = {}
+        failed = set()
+        if len(filenames) < 2:
+            return encoded_files, failed
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_READS, len(filenames))) as executor:
+            futures = {
+                filename: executor.submit(self.convert_file_to_base64, filename, raw_base64)
+                for filename in filenames
+            }
+        for filename, future in futures.items():
+            try:
+                encoded_files[filename] = future.result()
+            except Exception as e:
+                logger.error("Error converting file %s to %s: %s", filename, output_kind, e)
+                failed.add(filename)
+        return encoded_files, failed
+    
+    def _convert_files_in_object(self, response_obj: Any, filenames: Set[str], raw_base64: bool, output_kind: str,
+                                 encoded_files: Dict[str, str], failed: Set[str]) -> str:
+        """
+        Replace string values that are a known filename (or its [FILE_AVAILABLE: ...] placeholder)
+        with the file's base64 encoding, then serialize the result once with orjson.
+        encoded_files and failed hold files already encoded up front and are updated in place.
+        """
+        replaced = set()
+        
+        def encode(filename):
+            if filename in failed:
+                return None
+            encoded = encoded_files.get(filename)
+            if encoded is None:
+                try:
+                    encoded = encoded_files[filename] = self.convert_file_to_base64(filename, raw_base64=raw_base64)
+                except Exception as e:
+                    logger.error("Error converting file %s to %s: %s", filename, output_kind, e)
+                    # Keep the original value if conversion fails
+                    failed.add(filename)
+            return encoded
+        
+        def replace_files(value):
+            if isinstance(value, dict):
+                return {key: replace_files(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [replace_files(item) for item in value]
+            if isinstance(value, str):
+                filename = value
+                if value.startswith("[FILE_AVAILABLE: ") and value.endswith("]"):
+                    filename = value[17:-1]
+                if filename in filenames:
+                    encoded = encode(filename)
+                    if encoded is not None:
+                        replaced.add(filename)
+                        return encoded
+            return value
+        
+        converted = replace_files(response_obj)
+        
+        for filename in filenames - failed:
+            if filename in replaced:
+                logger.debug("Replaced file %s with %s in final output", filename, output_kind)
+            else:
+                logger.warning("No placeholder found for file %s", filename)
+        
+        return orjson.dumps(converted, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    def filter_data_for_llm(self, data: Any, found_files: Optional[Set[str]] = None) -> Any:
         """
         Filter data for LLM processing - replace filenames with placeholders.
         This prepares data for the LLM by replacing file references with readable placeholders.
         
         Args:
             data: Data that may contain file references
+            found_files: Optional set that collects every filename replaced by a placeholder,
+                         so the response converters can skip scanning the data again
             
         Returns:
             Filtered data with file references replaced by placeholders
@@ -518,14 +662,22 @@ class FileManager:
                 # Skip internal formatting keys
                 if key.startswith("_"):
                     continue
-                elif isinstance(value, str) and self.is_filename(value):
-                    # This looks like a filename - note it as an available file
-                    filtered_data[key] = f"[FILE_AVAILABLE: {value}]"
-                elif isinstance(value, str) and len(value) > 1000:
-                    # Truncate very long strings
-                    filtered_data[key] = value[:500] + f"... [TRUNCATED: {len(value)} total chars]"
+                elif isinstance(value, str):
+                    if self.is_filename(value):
+                        # This looks like a filename - note it as an available file
+                        filtered_data[key] = f"[FILE_AVAILABLE: {value}]"
+                        if found_files is not None:
+                            found_files.add(value)
+                    elif len(value) > 1000:
+                        # Truncate very long strings
+                        filtered_data[key] = value[:500] + f"... [TRUNCATED: {len(value)} total chars]"
+                    else:
+                        filtered_data[key] = value
+                elif isinstance(value, (dict, list)):
+                    filtered_data[key] = self.filter_data_for_llm(value, found_files)
                 else:
-                    filtered_data[key] = self.filter_data_for_llm(value)
+                    # Numbers, booleans, None, etc. pass through without a recursive call
+                    filtered_data[key] = value
             
             # If this was originally a list format, mention that
             if data.get("_original_format") == "list" and "_list_data" in data:
@@ -533,7 +685,10 @@ class FileManager:
                 
             return filtered_data
         elif isinstance(data, list):
-            return [self.filter_data_for_llm(item) for item in data]
+            return [
+                self.filter_data_for_llm(item, found_files) if isinstance(item, (dict, list)) else item
+                for item in data
+            ]
         else:
             return data
 
@@ -5,78 +5,205 @@ Each test case correlates with a specific question file and expected response fo
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import atexit
+import contextlib
+import functools
+import hashlib
+import pickle
+import orjson
 import time
 import os
 import sys
-import argparse
+import io
+import math
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Configuration
 API_BASE_URL = "https://api.dhruvagoyal.com/api/"
 TEST_FILES_DIR = Path(__file__).parent
 
-def send_request(question_file_path, additional_files=None):
+# Largest span a single "start-end" range may cover
+MAX_TEST_RANGE = 10_000
+
+# One comma-separated test spec: a number or a "start-end" range
+TEST_SPEC = re.compile(r'^\s*(\d+)\s*(?:-\s*(\d+))?\s*$')
+
+# Default cap on tests in flight at once; each API request runs heavy analysis and LLM calls,
+# so flooding the server only queues requests behind each other
+DEFAULT_CONCURRENCY = 4
+
+# Seconds to wait for the warm-up request before starting a concurrent batch anyway
+WARMUP_TIMEOUT = 5
+
+# Bytes of a failed response's body to read for the error preview; the rest is never downloaded
+ERROR_PREVIEW_BYTES = 512
+
+# Opt-in (--cache) store of successful responses, keyed by a hash of the URL and uploaded files
+RESPONSE_CACHE_DIR = Path.home() / '.cache' / 'tds-p2'
+USE_RESPONSE_CACHE = False
+
+# One pooled session for all requests, so connections (and TLS sessions) are reused across tests.
+# Only connection failures are retried (POST is not an idempotent method for Retry), so a request
+# that reached the server is never resent.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=Retry(total=2, backoff_factor=0.2))
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+atexit.register(SESSION.close)
+
+class MultipartFileStream:
+    """
+    Streaming multipart/form-data body for file fields.
+    File contents are read in blocks while requests sends the body, so uploads are never held in
+    memory whole; the total length is known up front, so a regular Content-Length header is sent.
+    """
+    
+    def __init__(self, files):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        parts = []
+        length = 0
+        for field_name, file_obj in files.items():
+            # Same part headers requests writes for file uploads (filename taken from the file's path)
+            filename = os.path.basename(file_obj.name)
+            header = (
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n\r\n'
+            ).encode('utf-8')
+            parts += [header, file_obj, b'\r\n']
+            length += len(header) + os.fstat(file_obj.fileno()).st_size + 2
+        trailer = f'--{boundary}--\r\n'.encode('utf-8')
+        parts.append(trailer)
+        self.len = length + len(trailer)
+        self._parts = iter(parts)
+        self._part = next(self._parts)
+        self._offset = 0
+    
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.len
+        chunks = []
+        while size > 0 and self._part is not None:
+            if isinstance(self._part, bytes):
+                chunk = self._part[self._offset:self._offset + size]
+                self._offset += len(chunk)
+                exhausted = self._offset >= len(self._part)
+            else:
+                chunk = self._part.read(size)
+                exhausted = not chunk
+            if exhausted:
+                self._part = next(self._parts, None)
+                self._offset = 0
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+def response_cache_path(question_file_path, additional_files):
+    """Cache file for a request: BLAKE2b-128 of the API URL, field names and file contents."""
+    digest = hashlib.blake2b(API_BASE_URL.encode('utf-8'), digest_size=16)
+    fields = {'questions.txt': question_file_path, **(additional_files or {})}
+    for field_name, path in fields.items():
+        digest.update(field_name.encode('utf-8') + b'\0')
+        digest.update(Path(path).read_bytes())
+    return RESPONSE_CACHE_DIR / f"{digest.hexdigest()}.pickle"
+
+def load_cached_response(cache_path):
+    """Return the cached response at `cache_path`, or None if it is missing or unreadable."""
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+def store_cached_response(cache_path, result):
+    """Write a response to the cache, replacing atomically so concurrent tests never read a partial file."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+def send_request(question_file_path, additional_files=None, out=None):
     """
     Send a request to the API endpoint with the specified files.
     
     Args:
         question_file_path (str): Path to the questions.txt file
-        additional_files (dict): Optional additional files to send
+        additional_files (dict): Optional additional files to send (paths must exist)
+        out: Optional stream for progress output (defaults to stdout)
     
     Returns:
         dict: Response from the API
     """
-    files = {'questions.txt': open(question_file_path, 'rb')}
-    
-    if additional_files:
-        for filename, filepath in additional_files.items():
-            if os.path.exists(filepath):
-                files[filename] = open(filepath, 'rb')
-    
     try:
-        print(f"\n{'='*60}")
-        print(f"Sending request for: {question_file_path}")
+        print(f"\n{'='*60}", file=out)
+        print(f"Sending request for: {question_file_path}", file=out)
         if additional_files:
-            print(f"Additional files: {list(additional_files.keys())}")
-        print(f"{'='*60}")
+            print(f"Additional files: {list(additional_files.keys())}", file=out)
+        print(f"{'='*60}", file=out)
         
-        start_time = time.time()
-        response = requests.post(API_BASE_URL, files=files)
-        end_time = time.time()
+        cache_path = None
+        if USE_RESPONSE_CACHE:
+            cache_path = response_cache_path(question_file_path, additional_files)
+            cached = load_cached_response(cache_path)
+            if cached is not None:
+                print(f"Response loaded from cache: {cache_path}", file=out)
+                return cached
         
-        # Close all file handles
-        for file_obj in files.values():
-            file_obj.close()
+        # Every handle is closed when the upload finishes, including when an open or the request fails
+        with contextlib.ExitStack() as stack:
+            files = {'questions.txt': stack.enter_context(open(question_file_path, 'rb'))}
+            if additional_files:
+                for filename, filepath in additional_files.items():
+                    files[filename] = stack.enter_context(open(filepath, 'rb'))
+            
+            start_ns = time.perf_counter_ns()
+            body = MultipartFileStream(files)
+            response = SESSION.post(API_BASE_URL, data=body, headers={'Content-Type': body.content_type}, stream=True)
+            with response:
+                if response.status_code == 200:
+                    content = response.content
+                else:
+                    preview = response.raw.read(ERROR_PREVIEW_BYTES, decode_content=True).decode('utf-8', 'replace')
+            elapsed_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
         
-        print(f"Response Status: {response.status_code}")
-        print(f"Response Time: {end_time - start_time:.2f} seconds")
+        print(f"Response Status: {response.status_code}", file=out)
+        print(f"Response Time: {elapsed_ms} ms", file=out)
         
         if response.status_code == 200:
             try:
-                result = response.json()
-                print(f"Response Status: {result.get('status', 'unknown')}")
+                result = orjson.loads(content)
+                print(f"Response Status: {result.get('status', 'unknown')}", file=out)
                 if 'result' in result:
-                    print(f"Result Type: {type(result['result']).__name__}")
+                    print(f"Result Type: {type(result['result']).__name__}", file=out)
+                    # Parse once and keep the decoded result for display in run_single_test
+                    result['_parsed'] = result['result']
                     if isinstance(result['result'], str):
                         # Try to parse as JSON if it's a string
                         try:
-                            parsed_result = json.loads(result['result'])
-                            print(f"Parsed Result Keys: {list(parsed_result.keys()) if isinstance(parsed_result, dict) else 'Not a dict'}")
-                        except json.JSONDecodeError:
-                            print(f"Result Length: {len(result['result'])} characters")
+                            result['_parsed'] = parsed_result = orjson.loads(result['result'])
+                            print(f"Parsed Result Keys: {list(parsed_result.keys()) if isinstance(parsed_result, dict) else 'Not a dict'}", file=out)
+                        except orjson.JSONDecodeError:
+                            print(f"Result Length: {len(result['result'])} characters", file=out)
                     else:
-                        print(f"Result: {result['result']}")
+                        print(f"Result: {result['result']}", file=out)
+                if cache_path:
+                    store_cached_response(cache_path, result)
                 return result
-            except json.JSONDecodeError:
-                print(f"Raw Response: {response.text[:500]}...")
+            except orjson.JSONDecodeError:
+                print(f"Raw Response: {content[:500].decode('utf-8', 'replace')}...", file=out)
                 return {"error": "Invalid JSON response"}
         else:
-            print(f"Error Response: {response.text}")
-            return {"error": f"HTTP {response.status_code}", "details": response.text}
+            print(f"Error Response: {preview}", file=out)
+            return {"error": f"HTTP {response.status_code}", "details": preview}
             
     except Exception as e:
-        print(f"Request failed: {str(e)}")
+        print(f"Request failed: {str(e)}", file=out)
         return {"error": str(e)}
 
 # Test case definitions
@@ -118,58 +245,103 @@ TEST_CASES = {
     }
 }
 
-def run_single_test(test_number):
-    """Run a single test case by number."""
+def _resolve_test_paths():
+    """Resolve every test's file paths once at import instead of on each run."""
+    for test_case in TEST_CASES.values():
+        test_case['question_path'] = TEST_FILES_DIR / test_case['question_file']
+        test_case['additional_paths'] = None
+        test_case['missing_files'] = []
+        if test_case['additional_files']:
+            test_case['additional_paths'] = {}
+            for filename, filepath in test_case['additional_files'].items():
+                full_path = TEST_FILES_DIR / filepath
+                if full_path.exists():
+                    test_case['additional_paths'][filename] = full_path
+                else:
+                    test_case['missing_files'].append(full_path)
+        # Sender bound to this test's files; only the output stream is passed per run
+        test_case['send'] = functools.partial(send_request, test_case['question_path'], test_case['additional_paths'])
+
+_resolve_test_paths()
+
+def run_single_test(test_number, out=None):
+    """Run a single test case by number, writing its output to `out` (stdout by default)."""
     if test_number not in TEST_CASES:
-        print(f"❌ Invalid test number: {test_number}")
-        print(f"Available tests: {list(TEST_CASES.keys())}")
+        print(f"❌ Invalid test number: {test_number}", file=out)
+        print(f"Available tests: {list(TEST_CASES.keys())}", file=out)
         return None
         
     test_case = TEST_CASES[test_number]
     
-    print(f"\n{test_case['emoji']} Test Case {test_number}: {test_case['name']}")
-    print(test_case['description'])
+    print(f"\n{test_case['emoji']} Test Case {test_number}: {test_case['name']}", file=out)
+    print(test_case['description'], file=out)
     
-    # Prepare additional files if needed
-    additional_files = None
-    if test_case['additional_files']:
-        additional_files = {}
-        for filename, filepath in test_case['additional_files'].items():
-            full_path = TEST_FILES_DIR / filepath
-            if full_path.exists():
-                additional_files[filename] = full_path
-            else:
-                print(f"⚠️ Warning: Additional file not found: {full_path}")
+    for full_path in test_case['missing_files']:
+        print(f"⚠️ Warning: Additional file not found: {full_path}", file=out)
     
     # Run the test
-    result = send_request(
-        TEST_FILES_DIR / test_case['question_file'],
-        additional_files
-    )
+    result = test_case['send'](out=out)
     
     # Display result
     status = "✅ PASS" if result.get('status') == 'success' else "❌ FAIL"
-    print(f"\nResult: {status}")
+    print(f"\nResult: {status}", file=out)
     
     # Print full output
-    print(f"\n{'='*60}")
-    print("📄 FULL TEST OUTPUT:")
-    print(f"{'='*60}")
+    print(f"\n{'='*60}", file=out)
+    print("📄 FULL TEST OUTPUT:", file=out)
+    print(f"{'='*60}", file=out)
     
     if 'error' in result:
-        print(f"❌ Error: {result['error']}")
+        print(f"❌ Error: {result['error']}", file=out)
         if 'details' in result:
-            print(f"Details: {result['details']}")
+            print(f"Details: {result['details']}", file=out)
     else:
-        # Pretty print the full result
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        # Pretty print the full result, showing the already-parsed result in place of its JSON string
+        display = {key: value for key, value in result.items() if key != '_parsed'}
+        if '_parsed' in result:
+            display['result'] = result['_parsed']
+        print(orjson.dumps(display, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode(), file=out)
     
-    print(f"{'='*60}")
+    print(f"{'='*60}", file=out)
     
     return result
 
-def run_test_suite(test_numbers=None):
-    """Run test cases. If test_numbers is None, run all tests."""
+def run_buffered_test(test_number):
+    """
+    Run a test with its output captured, so concurrently running tests don't interleave.
+    Returns the captured output, the result and the test's wall time in seconds.
+    """
+    out = io.StringIO()
+    start_time = time.monotonic()
+    result = run_single_test(test_number, out)
+    return out.getvalue(), result, time.monotonic() - start_time
+
+def write_output(text):
+    """Write a test's buffered output to stdout in one call."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+def warm_up():
+    """
+    Send one lightweight HEAD to the API before a concurrent batch, so connection setup and any
+    server cold start happen once instead of stalling every parallel request.
+    The API has no health route; any response (even 405) means the server is up and the pooled
+    connection is open.
+    """
+    try:
+        SESSION.head(API_BASE_URL, timeout=WARMUP_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"⚠️ Warm-up request failed: {e}")
+
+def run_test_suite(test_numbers=None, warmup=True, concurrency=None):
+    """
+    Run test cases. If test_numbers is None, run all tests.
+    At most `concurrency` tests run at once (default: DEFAULT_CONCURRENCY).
+    """
     
     if test_numbers is None:
         test_numbers = list(TEST_CASES.keys())
@@ -179,16 +351,38 @@ def run_test_suite(test_numbers=None):
     print(f"Test Files Directory: {TEST_FILES_DIR}")
     print(f"Running tests: {test_numbers}")
     
-    test_results = []
-    
+    valid_tests = []
     for test_num in test_numbers:
         if test_num in TEST_CASES:
-            result = run_single_test(test_num)
-            if result is not None:
-                test_results.append((test_num, TEST_CASES[test_num]['name'], result))
+            valid_tests.append(test_num)
         else:
             print(f"❌ Skipping invalid test number: {test_num}")
     
+    results = {}
+    latencies = []
+    if len(valid_tests) > 1:
+        # Requests run concurrently, so total time is roughly the slowest test instead of the sum.
+        # Each test's output is buffered and printed as a block when it finishes.
+        if warmup:
+            warm_up()
+        workers = min(len(valid_tests), max(1, concurrency or DEFAULT_CONCURRENCY))
+        print(f"Dispatching {len(valid_tests)} tests concurrently (up to {workers} at a time)")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_buffered_test, test_num): test_num for test_num in valid_tests}
+            for future in as_completed(futures):
+                output, results[futures[future]], elapsed = future.result()
+                latencies.append(elapsed)
+                write_output(output)
+    else:
+        for test_num in valid_tests:
+            results[test_num] = run_single_test(test_num)
+    
+    test_results = [
+        (test_num, TEST_CASES[test_num]['name'], results[test_num])
+        for test_num in valid_tests
+        if results[test_num] is not None
+    ]
+    
     # Summary Report
     if len(test_results) > 1:
         print(f"\n{'='*80}")
@@ -201,6 +395,11 @@ def run_test_suite(test_numbers=None):
             if 'error' in result:
                 print(f"  Error: {result['error']}")
         
+        if latencies:
+            # Latency spread helps pick --concurrency: a p95 far above p50 means the server is saturated
+            latencies.sort()
+            print(f"\nLatency: p50 {percentile(latencies, 50):.2f}s, p95 {percentile(latencies, 95):.2f}s")
+        
         print(f"\n{'='*80}")
         print("🎯 Test Suite Complete!")
         print(f"{'='*80}")
@@ -251,32 +450,25 @@ def interactive_mode():
 
 def parse_test_numbers(input_str):
     """Parse test numbers from input string."""
-    test_numbers = []
-    
-    # Split by comma
-    parts = [part.strip() for part in input_str.split(',')]
+    test_numbers = set()
     
-    for part in parts:
-        if '-' in part:
-            # Handle ranges like "1-3"
-            try:
-                start, end = map(int, part.split('-'))
-                test_numbers.extend(range(start, end + 1))
-            except ValueError:
-                raise ValueError(f"Invalid range format: {part}")
-        else:
-            # Handle single numbers
-            try:
-                test_numbers.append(int(part))
-            except ValueError:
-                raise ValueError(f"Invalid number: {part}")
+    for part in input_str.split(','):
+        match = TEST_SPEC.match(part)
+        if not match:
+            raise ValueError(f"Invalid test number or range: {part.strip()}")
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else start
+        if end - start >= MAX_TEST_RANGE:
+            raise ValueError(f"Range too large: {part.strip()}")
+        test_numbers.update(range(start, end + 1))
     
-    # Remove duplicates and sort
-    return sorted(list(set(test_numbers)))
+    return sorted(test_numbers)
 
 def main():
     """Main function to handle command line arguments."""
-    global API_BASE_URL
+    # Imported here so importing this module (e.g. to reuse send_request) doesn't load argparse
+    import argparse
+    global API_BASE_URL, USE_RESPONSE_CACHE
     
     parser = argparse.ArgumentParser(
         description="API Test Suite - Choose which tests to run",
@@ -289,6 +481,7 @@ Examples:
   python test.py --test 1,3,5       # Run tests 1, 3, and 5
   python test.py --test 1-3         # Run tests 1, 2, and 3
   python test.py --list             # List all available tests
+  python test.py --test 3 --cache   # Reuse the saved response if test 3's inputs are unchanged
         """
     )
     
@@ -296,25 +489,29 @@ Examples:
     parser.add_argument('--all', '-a', action='store_true', help='Run all tests')
     parser.add_argument('--list', '-l', action='store_true', help='List all available tests')
     parser.add_argument('--url', '-u', type=str, default=API_BASE_URL, help=f'API base URL (default: {API_BASE_URL})')
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY, help=f'Maximum number of tests to run at once (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--cache', action='store_true', help=f'Reuse saved responses for unchanged inputs (stored in {RESPONSE_CACHE_DIR})')
+    parser.add_argument('--no-warmup', action='store_true', help='Skip the warm-up request before running tests concurrently')
     
     args = parser.parse_args()
     
     # Update API URL if provided
     API_BASE_URL = args.url
+    USE_RESPONSE_CACHE = args.cache
     
     if args.list:
         list_tests()
         return
     
     if args.all:
-        run_test_suite()
+        run_test_suite(warmup=not args.no_warmup, concurrency=args.concurrency)
         return
     
     if args.test:
         try:
             test_numbers = parse_test_numbers(args.test)
             if test_numbers:
-                run_test_suite(test_numbers)
+                run_test_suite(test_numbers, warmup=not args.no_warmup, concurrency=args.concurrency)
             else:
                 print("❌ No valid test numbers provided")
                 list_tests()